@@ -0,0 +1,170 @@
+"""
+Sam Taylor
+October 18 2026
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import numpy as np
+
+class ArtifactCache:
+    """
+    ArtifactCache saves the outputs of pipeline stages (e.g. finding
+    word pairs, finding constraints) to disk, so the next run with the
+    same inputs can load them instead of recomputing them.
+    directory - folder where cached artifacts are saved
+    max_bytes - most disk space the cache is allowed to use. When it
+                uses more than this, the least recently used artifacts
+                are deleted first.
+    Artifacts are keyed by a hash of their inputs, so changing any
+    input (like a dictionary file's contents) just means a new key.
+    Artifacts are pickled, except for dicts of numpy arrays saved with
+    put_arrays, which are memory-mapped back in by get_arrays instead
+    of being read.
+    """
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+
+    @staticmethod
+    def make_key(*parts):
+        """
+        Hash any number of inputs into a key. Parts that aren't bytes
+        are hashed by their repr, so stick to strs, ints and the like.
+        """
+        h = hashlib.sha256()
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = repr(part).encode()
+            # Include each part's length so ('ab', 'c') != ('a', 'bc')
+            h.update(len(part).to_bytes(8, 'little'))
+            h.update(part)
+        return h.hexdigest()
+
+
+    @staticmethod
+    def file_digest(path):
+        """
+        Hash the contents of a file
+        """
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+
+    def get(self, key):
+        """
+        Load the artifact saved under key, or None if there isn't one
+        (or it can't be loaded)
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                artifact = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A truncated or corrupt pickle can fail in all sorts of
+            # ways, and it's as good as a missing one. Delete it so it
+            # gets recomputed and saved again.
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        # Touch the file so it counts as recently used
+        os.utime(path)
+        return artifact
+
+
+    def put(self, key, artifact):
+        """
+        Save an artifact under key, then make room if the cache is
+        over its size limit
+        """
+        path = self._path(key)
+        # Write to a temporary file first so that a crash never leaves
+        # a half-written artifact behind
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        self._evict()
+
+
+    def get_arrays(self, key):
+        """
+        Load the dict of arrays saved under key with put_arrays, or None
+        if there isn't one (or it can't be loaded). Arrays are read-only
+        memmaps, so only the parts that get used are read from disk.
+        """
+        path = self._arrays_path(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            arrays = {entry.name[:-len('.npy')]: np.load(entry.path,
+                                                         mmap_mode='r')
+                      for entry in os.scandir(path)
+                      if entry.name.endswith('.npy')}
+        except Exception:
+            # Same as a corrupt pickle in get
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        # Touch the folder so it counts as recently used
+        os.utime(path)
+        return arrays
+
+
+    def put_arrays(self, key, arrays):
+        """
+        Save a dict of numpy arrays under key, one .npy file per array,
+        then make room if the cache is over its size limit
+        """
+        path = self._arrays_path(key)
+        # Same as put, the whole folder is written somewhere else first
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        os.makedirs(temp_path)
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_path, f'{name}.npy'), array)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temp_path, path)
+        self._evict()
+
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.pickle')
+
+
+    def _arrays_path(self, key):
+        return os.path.join(self.directory, f'{key}.arrays')
+
+
+    def _evict(self):
+        """
+        Delete least recently used artifacts until the cache fits in
+        max_bytes
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pickle'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            elif entry.name.endswith('.arrays'):
+                size = sum(array.stat().st_size
+                           for array in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path.endswith('.arrays'):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            total -= size
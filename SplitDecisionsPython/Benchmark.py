@@ -0,0 +1,253 @@
+"""
+Sam Taylor
+October 18 2026
+
+Benchmark how word pair finding scales.
+
+Every finder engine is run on the bundled dictionaries, plus synthetic
+dictionaries as big as you like. Wall time, peak memory and pairs per
+second are written to a JSON file, along with how long one WordPair
+takes to make and how much memory it takes up. If a baseline JSON file
+(i.e. the output of an earlier run) is given, anything that got slower
+or bigger by more than the tolerance is flagged as a regression.
+
+E.g.
+    python Benchmark.py --synthetic 300000 1000000 --output bench.json
+    python Benchmark.py --baseline bench.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from Shape import Shape
+from WordPair import WordPair
+from WordPairFinder import WordPairFinder
+
+TEXT_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'outdated', 'SplitDecPuzzlePy', 'TextFiles')
+BUNDLED_DICTIONARIES = [
+    'google-10000-english-usa-no-swears.txt',
+    'UsableDictionary.txt',
+    'ReferenceDictionary.txt',
+]
+
+
+def make_synthetic_dictionary(size, seed_words, output_file, seed=0):
+    """
+    Write a synthetic dictionary of size unique words. Words are real
+    words with one or two letters swapped out at random, so the
+    synthetic dictionary has about as many word pairs per word as a
+    real one.
+    """
+    rng = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz'
+    words = set(seed_words[:size])
+    while len(words) < size:
+        letters = list(rng.choice(seed_words))
+        for _ in range(rng.randint(1, 2)):
+            letters[rng.randrange(len(letters))] = rng.choice(alphabet)
+        words.add(''.join(letters))
+    with open(output_file, 'w') as f:
+        f.write('\n'.join(sorted(words)))
+        f.write('\n')
+
+
+def run_case(words_file, engine):
+    """
+    Time one benchmark case. This is meant to run in a fresh process,
+    so nothing is left over from other cases.
+    """
+    finder = WordPairFinder(words_file=words_file, engine=engine)
+    start = time.perf_counter()
+    word_pairs = finder.find_word_pairs()
+    seconds = time.perf_counter() - start
+    return {
+        'seconds': seconds,
+        'pairs': len(word_pairs),
+    }
+
+
+def trace_case(words_file, engine):
+    """
+    Peak memory one benchmark case allocates, in MB, traced with
+    tracemalloc. Tracing slows everything down, so this is a separate
+    run from run_case. The process's own peak (ru_maxrss) isn't used,
+    since on Linux a new process starts out with the peak of the
+    process that launched it.
+    """
+    tracemalloc.start()
+    finder = WordPairFinder(words_file=words_file, engine=engine)
+    finder.find_word_pairs()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1 << 20)
+
+
+def measure(words_file, engine, repeat):
+    """
+    Time a benchmark case repeat times and keep the fastest, then
+    trace its peak memory once. Every run is in its own process.
+    """
+    context = multiprocessing.get_context('spawn')
+    runs = []
+    for _ in range(repeat):
+        with context.Pool(1) as pool:
+            runs.append(pool.apply(run_case, (words_file, engine)))
+    with context.Pool(1) as pool:
+        peak_memory_mb = pool.apply(trace_case, (words_file, engine))
+    seconds = min(run['seconds'] for run in runs)
+    pairs = runs[0]['pairs']
+    return {
+        'seconds': seconds,
+        'peak_memory_mb': peak_memory_mb,
+        'pairs': pairs,
+        'pairs_per_second': pairs / seconds if seconds else 0.0,
+    }
+
+
+def measure_word_pairs(words_file, repeat):
+    """
+    Measure how long it takes to make one WordPair, and how much
+    memory one takes up, using the word pairs from a dictionary
+    """
+    finder = WordPairFinder(words_file=words_file, engine='numpy')
+    rows = [(length, index, word1, word2, usability)
+            for length, index, shape_pairs
+            in finder._iter_shapes(finder._read_words())
+            for word1, word2, usability in shape_pairs]
+
+    def make_word_pairs():
+        return [WordPair(Shape.get(length, index), word1, word2, usability)
+                for length, index, word1, word2, usability in rows]
+
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        make_word_pairs()
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    word_pairs = make_word_pairs()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del word_pairs
+    count = max(len(rows), 1)
+    return {
+        'word_pairs': len(rows),
+        'ns_per_pair': seconds / count * 1e9,
+        'bytes_per_pair': size / count,
+    }
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compare results with a baseline, and return a description of
+    every case that's slower or uses more memory than the baseline
+    by more than tolerance (e.g. 0.1 for 10%), or that found a
+    different number of word pairs
+    """
+    baseline_cases = {(case['dataset'], case['engine']): case
+                      for case in baseline['results']}
+    regressions = []
+    for case in results:
+        old = baseline_cases.get((case['dataset'], case['engine']))
+        if old is None:
+            continue
+        # A different number of pairs means something's broken
+        if case['pairs'] != old['pairs']:
+            regressions.append(
+                f'{case["dataset"]} [{case["engine"]}] pairs: '
+                f'{old["pairs"]} -> {case["pairs"]}')
+        for metric in ('seconds', 'peak_memory_mb'):
+            if case[metric] > old[metric] * (1 + tolerance):
+                regressions.append(
+                    f'{case["dataset"]} [{case["engine"]}] {metric}: '
+                    f'{old[metric]:.3f} -> {case[metric]:.3f}')
+    return regressions
+
+
+def find_word_pair_regressions(word_pair, baseline, tolerance):
+    """
+    Same as find_regressions, but for the output of measure_word_pairs
+    """
+    old = baseline.get('word_pair')
+    if not old:
+        return []
+    return [f'WordPair {metric}: {old[metric]:.1f} -> {word_pair[metric]:.1f}'
+            for metric in ('ns_per_pair', 'bytes_per_pair')
+            if word_pair[metric] > old[metric] * (1 + tolerance)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--engines', nargs='+',
+                        default=sorted(WordPairFinder.ENGINES),
+                        choices=sorted(WordPairFinder.ENGINES))
+    parser.add_argument('--dictionaries', nargs='*',
+                        default=BUNDLED_DICTIONARIES,
+                        help='dictionaries in the bundled TextFiles folder')
+    parser.add_argument('--synthetic', nargs='*', type=int, default=[300000],
+                        help='sizes of synthetic dictionaries to generate')
+    parser.add_argument('--word-pairs', default='UsableDictionary.txt',
+                        help='bundled dictionary whose word pairs are used '
+                             'to measure WordPair construction time and '
+                             'memory')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline',
+                        help='earlier output file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        datasets = [(name, os.path.join(TEXT_FILES, name))
+                    for name in args.dictionaries]
+        if args.synthetic:
+            with open(os.path.join(TEXT_FILES, 'ReferenceDictionary.txt')) as f:
+                seed_words = [line.strip() for line in f if line.strip()]
+        for size in args.synthetic:
+            words_file = os.path.join(temp_dir, f'synthetic-{size}.txt')
+            make_synthetic_dictionary(size, seed_words, words_file)
+            datasets.append((f'synthetic-{size}', words_file))
+
+        results = []
+        for dataset, words_file in datasets:
+            with open(words_file) as f:
+                word_count = sum(1 for _ in f)
+            for engine in args.engines:
+                case = {'dataset': dataset, 'words': word_count, 'engine': engine}
+                case.update(measure(words_file, engine, args.repeat))
+                results.append(case)
+                print(f'{dataset:>40} {engine:>8}  '
+                      f'{case["seconds"]:8.3f} s  '
+                      f'{case["peak_memory_mb"]:8.1f} MB  '
+                      f'{case["pairs_per_second"]:10.0f} pairs/s')
+
+    word_pair = measure_word_pairs(os.path.join(TEXT_FILES, args.word_pairs),
+                                   args.repeat)
+    print(f'{"WordPair":>40} {word_pair["ns_per_pair"]:8.0f} ns/pair  '
+          f'{word_pair["bytes_per_pair"]:8.0f} bytes/pair')
+
+    report = {'results': results, 'word_pair': word_pair}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['regressions'] = find_regressions(results, baseline,
+                                                 args.tolerance)
+        report['regressions'].extend(find_word_pair_regressions(
+            word_pair, baseline, args.tolerance))
+        for regression in report['regressions']:
+            print(f'REGRESSION {regression}')
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
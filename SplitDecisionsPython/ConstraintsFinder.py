@@ -4,99 +4,518 @@ October 12 2024
 """
 
 import SplitDecisionsUtil as sdu
-from functools import cmp_to_key
-from itertools import combinations_with_replacement as combos
+import WordPairWriter as wpw
+from ArtifactCache import ArtifactCache
+from ConstraintsProfile import ConstraintsProfile
+from PromptIndex import PromptIndex
+from WordPair import WordPair
+from Shape import Shape
+from itertools import groupby
+from multiprocessing import Pool
+import heapq
+import time
 import numpy as np
 
+# How many chunks of prompts each process gets in parallel mode. More
+# chunks balance better, fewer chunks cost less to send around.
+CHUNKS_PER_PROCESS = 4
+
 class ConstraintsFinder:
-    def __init__(self, min_usability=2):
+    """
+    ConstraintsFinder finds the mistakeables and anchors of usable word
+    pairs, one prompt at a time.
+    min_usability - word pairs less usable than this are only used to
+                    constrain the usable ones, and aren't kept
+    cache - optional ArtifactCache for get_constraints
+    processes - number of processes get_constraints uses. Prompts are
+                independent, so with more than 1 they're split between
+                a pool of processes.
+    profile - ConstraintsProfile of every prompt constrained so far, if
+              the finder was made with profile=True, otherwise None
+    word_pairs - every constrained word pair found so far
+    """
+    def __init__(self, min_usability=2, cache=None, processes=1,
+                 profile=False):
         self.min_usability = min_usability
+        self.cache = cache
+        self.processes = processes
+        self.profile = ConstraintsProfile() if profile else None
         self.word_pairs = []
 
     
-    def write_word_pairs_to_file(self, output_file):
-        wp_display = [wp for wp in self.word_pairs]
-        wp_display.sort(key=cmp_to_key(sdu.compare_word_pairs_display))
-        with open(output_file, 'w+') as f:
-            for word_pair in wp_display:
-                f.write(f'{word_pair}  {word_pair.show_mistakeables()}  {word_pair.show_anchors()}\n')
-
-
-    def get_constraints(self, word_pairs):
-        wps_by_prompt = []
-        word_pairs.sort(key=cmp_to_key(sdu.compare_word_pairs_by_prompt))
-        current_prompt = []
-        for i, wp in enumerate(word_pairs):
-            current_prompt.append(wp)
-            if i == (len(word_pairs) - 1):
-                wps_by_prompt.append(current_prompt)
-                break
-            if wp.prompt_id != word_pairs[i + 1].prompt_id:
-                wps_by_prompt.append(current_prompt)
-                current_prompt = []
-        for prompt in wps_by_prompt:
-            # handle the trivial case for mistakeables and anchors
-            if len(prompt) == 1:
-                wp = prompt[0]
-                if wp.usability < self.min_usability:
-                    continue
-                wp.mistakeables = [0 for _ in wp.letters]
-                wp.anchors = [0]
-                self.word_pairs.append(wp)
+    def write_word_pairs_to_file(self, output_file, word_pairs=None,
+                                 binary=False):
+        """
+        Write constrained word pairs to a file for display. By default,
+        write all of this finder's word pairs. A stream of constrained
+        word pairs (e.g. from iter_constraints) can be written instead,
+        as long as it's grouped by shape in order of shape.
+        If binary is True, write a compact binary file instead, which
+        WordPairWriter.read_word_pairs_binary can load back.
+        """
+        if binary:
+            wpw.write_word_pairs_binary(
+                self.word_pairs if word_pairs is None else word_pairs,
+                output_file)
+        elif word_pairs is None:
+            wpw.write_word_pairs(self.word_pairs, output_file,
+                                 wpw.format_constraints)
+        else:
+            wpw.write_word_pairs(word_pairs, output_file,
+                                 wpw.format_constraints, grouped=True)
+
+
+    def get_constraints(self, word_pairs, source_key=None):
+        """
+        Find mistakeables and anchors for every usable word pair, and
+        keep track of those word pairs. word_pairs can be any iterable
+        of word pairs; it doesn't need to be sorted.
+        If this finder has a cache, source_key identifies where the
+        word pairs came from (e.g. WordPairFinder.cache_key()), so
+        constraints for the same word pairs can be loaded next time.
+        """
+        if self.cache is None or source_key is None:
+            self.word_pairs.extend(self._iter_sorted_constraints(word_pairs))
+            return self.word_pairs
+        key = ArtifactCache.make_key('ConstraintsFinder',
+                                     source_key,
+                                     self.min_usability)
+        cached = self.cache.get(key)
+        if cached is None:
+            constrained = list(self._iter_sorted_constraints(word_pairs))
+            self.cache.put(key, [(wp.shape.length,
+                                  wp.shape.index,
+                                  wp.words[0],
+                                  wp.words[1],
+                                  wp.usability,
+                                  [int(m) for m in wp.mistakeables],
+                                  wp.anchors) for wp in constrained])
+        else:
+            constrained = []
+            for (length, index, word1, word2, usability,
+                 mistakeables, anchors) in cached:
+                wp = WordPair(Shape.get(length, index), word1, word2, usability)
+                wp.mistakeables = mistakeables
+                wp.anchors = anchors
+                constrained.append(wp)
+        self.word_pairs.extend(constrained)
+        return self.word_pairs
+
+
+    def get_constraints_table(self, table):
+        """
+        Find mistakeables and anchors for every usable word pair in a
+        WordPairTable. Returns a new table of just the usable word
+        pairs, grouped by prompt in order of prompt id, with their
+        mistakeables and anchors filled in. Unlike get_constraints,
+        nothing is kept track of.
+        """
+        # Group rows by prompt with one sort, instead of comparing
+        # neighbors in a loop
+        prompts = PromptIndex(table.prompt_id)
+        order = prompts.order
+        letter_bits = table.letter_bits()[order]
+        # Mistakeables for every row at once, in a uint32 matrix
+        mistakeables = find_mistakeables(letter_bits, prompts.starts)
+        all_bits = letter_bits.tolist()
+        usable = (table.usability[order] >= self.min_usability).tolist()
+        letter_counts = (table.length[order].astype(np.int64) - 2).tolist()
+        constrained_rows = []
+        anchors = []
+        for _, start, stop in prompts.slices():
+            if not any(usable[start:stop]):
                 continue
+            letter_count = letter_counts[start]
+            prompt_bits = [bits[:letter_count] for bits in all_bits[start:stop]]
+            if self.profile is None:
+                prompt_anchors = find_prompt_anchors(prompt_bits,
+                                                     usable[start:stop])
+            else:
+                prompt_anchors, record = _profile_prompt(
+                    find_prompt_anchors, prompt_bits, usable[start:stop])
+                wp = table.word_pair(order[start])
+                self.profile.add(wp.prompt_id, wp.prompt, record)
+            for n, wp_anchors in prompt_anchors:
+                constrained_rows.append(start + n)
+                anchors.append(wp_anchors)
+                if not wp_anchors:
+                    print(f'No anchors found for word pair {table[order[start + n]]}. This should be impossible')
+        constrained = table.take(order[constrained_rows])
+        constrained.mistakeables = mistakeables[constrained_rows]
+        constrained.set_anchors(anchors)
+        return constrained
+
+
+    def _iter_sorted_constraints(self, word_pairs):
+        """
+        Group word pairs by prompt with a PromptIndex, then constrain
+        them one prompt at a time
+        """
+        word_pairs = list(word_pairs)
+        prompts = PromptIndex.from_word_pairs(word_pairs).group(word_pairs)
+        if self.processes > 1:
+            return self._iter_constraints_parallel(prompts)
+        return self._iter_prompt_constraints(prompts)
 
-            # Do setup for mistakeables.
-            # Consider the prompt -(ff/xp)--- for effort/export and effect/expect
-
-            # get each word letter-by-letter, broken down in its numerical encoding
-            # so in the example that's
-            # [[e, o, r, t]
-            #  [e, e, c, t]]
-            all_bits = [(wp.letters_bits) for wp in prompt]
-
-            # bitwise-or together the values for each letter
-            # So now in our example we have
-            # [e, eo, cr, t]
-            all_bits_by_letter = [np.bitwise_or.reduce(b) for b in zip(*all_bits)]
-
-            # now traverse every word pair in the prompt
-            for wp in prompt:
-                # skip over words that we won't consider for putting on the board
-                if wp.usability < self.min_usability:
-                    continue
-                # the mistakeables at each letter are the dissimilar letters
-                # so for the effort/export wordpair,
-                # [-, e, c, -]
-                wp.mistakeables = [ab & ~b for ab, b in zip(all_bits_by_letter, wp.letters_bits)]
-
-                # Now find anchors!
-                # An anchor is going to have the form of a combination
-                # of indices where if the indices marked 1 are filled
-                # in, a solver has all the info they need to solve that
-                # word pair. I.e. those indices differentiate that word
-                # pair from every other word pair with the same prompt.
-                letter_indices = list(range(len(wp.letters)))
-                # Traverse all combinations of indices. Accept all
-                # combos with the same size.
-                for size in range(1, len(wp.letters) + 1):
-                    for combo in combos(letter_indices, size):
-                        # Get relevant letters_bits
-                        others_bits = [[other.letters_bits[index] for index in combo] for other in prompt if other != wp]
-                        this_bits = [wp.letters_bits[index] for index in combo]
-                        # all other word pairs in this prompt must have
-                        #   any of the bits in this combo be unique
-                        if all([any([ob != b for ob, b in zip(other_bits, this_bits)]) for other_bits in others_bits]):
-                            # write the anchor as a bit string
-                            index_combo = 0
-                            for index in combo:
-                                index_combo |= (1 << (len(wp.letters) - 1 - index))
-                            # and add to anchors list
-                            wp.anchors.append(index_combo)
-                    if wp.anchors:
-                        break
+
+    def _iter_constraints_parallel(self, prompts):
+        """
+        Same as _iter_prompt_constraints, but prompts are constrained
+        by a pool of processes. Prompts are sent off in chunks of about
+        the same amount of work, biggest chunks first, and the results
+        are put back together in order of prompt, so the output is the
+        same no matter how many processes there are.
+        """
+        usable_prompts = []
+        for prompt in prompts:
+            usable = [wp.usability >= self.min_usability for wp in prompt]
+            if any(usable):
+                usable_prompts.append((prompt, usable))
+        prompts = usable_prompts
+        # Every usable word pair gets compared with every word pair in
+        # its prompt
+        costs = [len(prompt) * sum(usable) for prompt, usable in prompts]
+        chunks = _balance_chunks(costs, self.processes * CHUNKS_PER_PROCESS)
+        results = {}
+        with Pool(self.processes) as pool:
+            # Workers only get plain letters_bits and usability, which
+            # are much cheaper to send than WordPairs
+            pending = []
+            for chunk in chunks:
+                chunk_prompts = [([wp.letters_bits for wp in prompts[n][0]],
+                                  prompts[n][1]) for n in chunk]
+                pending.append((chunk, pool.apply_async(
+                    _constrain_chunk,
+                    (chunk_prompts, self.profile is not None))))
+            for chunk, result in pending:
+                results.update(zip(chunk, result.get()))
+        for n, (prompt, _) in enumerate(prompts):
+            constrained = results.pop(n)
+            if self.profile is not None:
+                constrained, record = constrained
+                self.profile.add(prompt[0].prompt_id, prompt[0].prompt, record)
+            for i, mistakeables, anchors in constrained:
+                wp = prompt[i]
+                wp.mistakeables = mistakeables
+                wp.anchors = anchors
                 if not wp.anchors:
                     print(f'No anchors found for word pair {wp}. This should be impossible')
-                self.word_pairs.append(wp)
-        return self.word_pairs
+                yield wp
+
+
+    def iter_constraints(self, word_pairs):
+        """
+        Find mistakeables and anchors for a stream of word pairs that's
+        already grouped by prompt, like the output of
+        WordPairFinder.iter_word_pairs. Usable word pairs are yielded
+        one prompt at a time, and aren't kept track of, so only one
+        prompt's word pairs are held in memory at a time.
+        Prompts must come in order, either by prompt id (like a binary
+        file written with by_prompt=True) or by shape then splits (like
+        WordPairFinder's output). Raises ValueError otherwise, since a
+        prompt could show up again after its group has ended, and its
+        constraints would be wrong.
+        """
+        return self._iter_prompt_constraints(_iter_grouped_prompts(word_pairs))
+
+
+    def iter_constraints_file(self, input_file):
+        """
+        Same as iter_constraints, but for a binary word pairs file
+        that's grouped by prompt (see
+        WordPairWriter.write_word_pairs_binary). E.g. a file written
+        from WordPairFinder.iter_word_pairs, or one written with
+        by_prompt=True. The file is streamed, never loaded all at once.
+        """
+        return self.iter_constraints(wpw.iter_word_pairs_binary(input_file))
+
+
+    def _iter_prompt_constraints(self, prompts):
+        """
+        Constrain a stream of prompts, i.e. lists of word pairs with the
+        same prompt, and yield the usable word pairs
+        """
+        for prompt in prompts:
+            yield from self._constrain_prompt(prompt)
+
+
+    def _constrain_prompt(self, prompt):
+        """
+        Find mistakeables and anchors for every usable word pair in a
+        list of word pairs with the same prompt, and return the usable
+        word pairs
+        """
+        all_bits = [wp.letters_bits for wp in prompt]
+        usable = [wp.usability >= self.min_usability for wp in prompt]
+        if self.profile is None or not any(usable):
+            prompt_constraints = constrain_prompt_bits(all_bits, usable)
+        else:
+            prompt_constraints, record = _profile_prompt(
+                constrain_prompt_bits, all_bits, usable)
+            self.profile.add(prompt[0].prompt_id, prompt[0].prompt, record)
+        constrained = []
+        for n, mistakeables, anchors in prompt_constraints:
+            wp = prompt[n]
+            wp.mistakeables = mistakeables
+            wp.anchors = anchors
+            if not wp.anchors:
+                print(f'No anchors found for word pair {wp}. This should be impossible')
+            constrained.append(wp)
+        return constrained
+
+
+def _iter_grouped_prompts(word_pairs):
+    """
+    Yield lists of word pairs with the same prompt from a stream that's
+    grouped by prompt. Checks that prompts come in order of prompt id,
+    or in order of shape then splits, so no prompt can show up twice.
+    Only the last prompt is remembered for the check, not every prompt
+    seen so far.
+    """
+    by_prompt_id = by_splits = True
+    last = None
+    for prompt_id, prompt in groupby(word_pairs, key=sdu.word_pair_prompt_key):
+        prompt = list(prompt)
+        wp = prompt[0]
+        splits_key = (wp.shape.value, wp.splits[0], wp.splits[1])
+        if last is not None:
+            by_prompt_id = by_prompt_id and last[0] < prompt_id
+            by_splits = by_splits and last[1] < splits_key
+            if not (by_prompt_id or by_splits):
+                raise ValueError(f'Word pairs with prompt id {prompt_id} are '
+                                 f'not grouped by prompt in order')
+        last = (prompt_id, splits_key)
+        yield prompt
+
+
+def constrain_prompt_bits(all_bits, usable, stats=None):
+    """
+    Find mistakeables and anchors for one prompt, given the
+    letters_bits of every word pair with that prompt and whether each
+    word pair is usable. Returns (n, mistakeables, anchors) for every
+    usable word pair, where n is its place in the prompt (none if
+    there are no word pairs).
+    stats is passed on to find_anchors.
+    """
+    constrained = []
+    if not all_bits:
+        return constrained
+    # handle the trivial case for mistakeables and anchors
+    if len(all_bits) == 1:
+        if usable[0]:
+            constrained.append((0, [0 for _ in all_bits[0]], [0]))
+        return constrained
+
+    # Do setup for mistakeables.
+    # Consider the prompt -(ff/xp)--- for effort/export and effect/expect
+
+    # each word is given letter-by-letter, broken down in its numerical
+    # encoding, so in the example that's
+    # [[e, o, r, t]
+    #  [e, e, c, t]]
+
+    # bitwise-or together the values for each letter
+    # So now in our example we have
+    # [e, eo, cr, t]
+    all_bits_by_letter = [0] * len(all_bits[0])
+    for letters_bits in all_bits:
+        for i, bits in enumerate(letters_bits):
+            all_bits_by_letter[i] |= bits
+
+    # now traverse every word pair in the prompt
+    for n, letters_bits in enumerate(all_bits):
+        # skip over words that we won't consider for putting on the board
+        if not usable[n]:
+            continue
+        # the mistakeables at each letter are the dissimilar letters
+        # so for the effort/export wordpair,
+        # [-, e, c, -]
+        mistakeables = [ab & ~b for ab, b in zip(all_bits_by_letter, letters_bits)]
+
+        constrained.append((n, mistakeables))
+
+    # Now find anchors!
+    anchors = find_prompt_anchors(all_bits, usable, stats)
+    return [(n, mistakeables, wp_anchors)
+            for (n, mistakeables), (_, wp_anchors) in zip(constrained, anchors)]
+
+
+def find_prompt_anchors(all_bits, usable, stats=None):
+    """
+    Find anchors for one prompt, given the letters_bits of every word
+    pair with that prompt and whether each word pair is usable. Returns
+    (n, anchors) for every usable word pair, where n is its place in
+    the prompt.
+    stats is passed on to find_anchors.
+    """
+    # handle the trivial case
+    if len(all_bits) == 1:
+        return [(0, [0])] if usable[0] else []
+    anchors = []
+    for n, letters_bits in enumerate(all_bits):
+        if not usable[n]:
+            continue
+        # Word pairs with the same prompt and letters are the same word
+        # pair, so they don't count as others
+        others_bits = [other for other in all_bits if other != letters_bits]
+        anchors.append((n, find_anchors(letters_bits, others_bits, stats)))
+    return anchors
+
+
+def _profile_prompt(find, all_bits, usable):
+    """
+    Run find (constrain_prompt_bits or find_prompt_anchors) on one
+    prompt and time it. Returns what find returns, and a record of
+    (size, letter count, anchor combos tried, seconds, anchor size) for
+    ConstraintsProfile.add.
+    """
+    stats = {'combos': 0}
+    start = time.perf_counter()
+    result = find(all_bits, usable, stats)
+    seconds = time.perf_counter() - start
+    # Anchors are always last, and every anchor a word pair has is the
+    # same size
+    anchor_size = max((item[-1][0].bit_count() for item in result if item[-1]),
+                      default=0)
+    record = (len(all_bits), len(all_bits[0]), stats['combos'], seconds,
+              anchor_size)
+    return result, record
+
+
+def find_mistakeables(letter_bits, starts):
+    """
+    Find the mistakeables of every word pair in a table at once.
+    letter_bits is an (n x width) array of letters_bits (like
+    WordPairTable.letter_bits), sorted so each prompt's rows are
+    together, and starts is the first row of each prompt. Returns an
+    (n x width) uint32 array of mistakeables.
+    Same as constrain_prompt_bits: or together each letter over a
+    prompt's rows, then take out each row's own letters.
+    """
+    letter_bits = np.asarray(letter_bits, dtype=np.uint32)
+    if not len(letter_bits):
+        return letter_bits.copy()
+    starts = np.asarray(starts, dtype=np.int64)
+    prompt_bits = np.bitwise_or.reduceat(letter_bits, starts, axis=0)
+    # Which prompt each row is in
+    row_prompts = np.repeat(np.arange(len(starts)),
+                            np.diff(np.append(starts, len(letter_bits))))
+    return prompt_bits[row_prompts] & ~letter_bits
+
+
+def _balance_chunks(costs, chunk_count):
+    """
+    Split items (e.g. prompts) into at most chunk_count chunks with
+    about the same total cost each, by giving the most costly item left
+    to the cheapest chunk so far. Returns lists of item numbers, most
+    costly chunk first.
+    """
+    chunks = [(0, n, []) for n in range(min(chunk_count, len(costs)))]
+    for item in sorted(range(len(costs)), key=lambda item: -costs[item]):
+        cost, n, chunk = heapq.heappop(chunks)
+        chunk.append(item)
+        heapq.heappush(chunks, (cost + costs[item], n, chunk))
+    chunks.sort(key=lambda chunk: (-chunk[0], chunk[1]))
+    return [chunk for _, _, chunk in chunks]
+
+
+def _constrain_chunk(prompts, profile=False):
+    """
+    Constrain a chunk of prompts in a worker process. prompts is a
+    list of (all_bits, usable) for constrain_prompt_bits. If profile is
+    True, each prompt's result comes with its profile record (see
+    _profile_prompt).
+    """
+    if profile:
+        return [_profile_prompt(constrain_prompt_bits, all_bits, usable)
+                for all_bits, usable in prompts]
+    return [constrain_prompt_bits(all_bits, usable)
+            for all_bits, usable in prompts]
+
+
+def find_anchors(letters_bits, others_bits, stats=None):
+    """
+    Find the anchors of one word pair, given its letters_bits and the
+    letters_bits of every other word pair with the same prompt.
+    An anchor is going to have the form of a combination of indices
+    where if the indices marked 1 are filled in, a solver has all the
+    info they need to solve that word pair. I.e. those indices
+    differentiate that word pair from every other word pair with the
+    same prompt.
+    Anchors are the smallest combinations of indices that hit at least
+    one difference with every other word pair, in the order
+    itertools.combinations would give them.
+    If stats is given, stats['combos'] goes up by the number of combos
+    of indices that were tried.
+    """
+    letter_count = len(letters_bits)
+    # For every other word pair, mark the indices where it differs
+    # from this one, with the same bit layout as an anchor. So for
+    # effort/export vs effect/expect ([e, o, r, t] vs [e, e, c, t])
+    # that's 0110.
+    diffs = set()
+    for other_bits in others_bits:
+        diff = 0
+        for this, other in zip(letters_bits, other_bits):
+            diff = (diff << 1) | (this != other)
+        diffs.add(diff)
+    # Some other word pair is the same as this one, so nothing tells
+    # them apart
+    if 0 in diffs:
+        return []
+    # Nothing to tell apart, so any one index will do
+    if not diffs:
+        return [1 << (letter_count - 1 - index) for index in range(letter_count)]
+    # An anchor that hits a diff also hits every diff that contains
+    # it, so only the diffs that don't contain another diff matter
+    minimal = []
+    for diff in sorted(diffs, key=int.bit_count):
+        if not any(diff & other == other for other in minimal):
+            minimal.append(diff)
+    everything = (1 << len(minimal)) - 1
+    # An index in no diff is never in a smallest anchor. For the rest,
+    # mark which diffs each index hits.
+    union = 0
+    for diff in minimal:
+        union |= diff
+    index_bits = [1 << (letter_count - 1 - index) for index in range(letter_count)
+                  if union & (1 << (letter_count - 1 - index))]
+    hits = [sum(1 << n for n, diff in enumerate(minimal) if diff & bit)
+            for bit in index_bits]
+    # remaining_hits[n] is every diff hit by indices n and later
+    remaining_hits = hits + [0]
+    for n in reversed(range(len(hits))):
+        remaining_hits[n] |= remaining_hits[n + 1]
+    # Diffs with no index in common need an index each, so anchors
+    # are at least that big
+    smallest, used = 0, 0
+    for diff in minimal:
+        if not diff & used:
+            smallest += 1
+            used |= diff
+    anchors = []
+    tried = [0]
+
+    def search(start, size, hit, anchor):
+        """
+        Add every anchor that extends anchor with size more indices
+        from start onwards, in order
+        """
+        if not size:
+            tried[0] += 1
+            if hit == everything:
+                anchors.append(anchor)
+            return
+        for n in range(start, len(index_bits) - size + 1):
+            # The indices left can't hit every diff
+            if hit | remaining_hits[n] != everything:
+                break
+            search(n + 1, size - 1, hit | hits[n], anchor | index_bits[n])
 
-            
\ No newline at end of file
+    for size in range(smallest, len(index_bits) + 1):
+        search(0, size, 0, 0)
+        if anchors:
+            break
+    if stats is not None:
+        stats['combos'] += tried[0]
+    return anchors
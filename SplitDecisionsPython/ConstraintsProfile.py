@@ -0,0 +1,73 @@
+"""
+Sam Taylor
+October 18 2026
+"""
+
+import json
+from collections import Counter
+
+class ConstraintsProfile:
+    """
+    ConstraintsProfile records how much work ConstraintsFinder did for
+    each prompt, to find out which prompts make constraint runs slow.
+    prompts - one dict per prompt, with:
+              prompt_id - the prompt's id (see WordPair.prompt_id)
+              prompt - the prompt, like -(ff/xp)---
+              size - number of word pairs with the prompt
+              letter_count - number of letters outside the split
+              combos - number of anchor combos tried
+              seconds - wall time spent on the prompt
+              anchor_size - most indices in any of the prompt's anchors
+    """
+    def __init__(self):
+        self.prompts = []
+
+
+    def add(self, prompt_id, prompt, record):
+        """
+        Record one prompt. record is (size, letter_count, combos,
+        seconds, anchor_size), like _profile_prompt in ConstraintsFinder
+        returns.
+        """
+        size, letter_count, combos, seconds, anchor_size = record
+        self.prompts.append({
+            'prompt_id': prompt_id,
+            'prompt': prompt,
+            'size': size,
+            'letter_count': letter_count,
+            'combos': combos,
+            'seconds': seconds,
+            'anchor_size': anchor_size,
+        })
+
+
+    def summary(self, top=20):
+        """
+        Summarize the profile: totals, a histogram of prompt sizes (with
+        how long prompts of each size took altogether), and the top
+        slowest prompts
+        """
+        sizes = Counter()
+        size_seconds = Counter()
+        for record in self.prompts:
+            sizes[record['size']] += 1
+            size_seconds[record['size']] += record['seconds']
+        slowest = sorted(self.prompts, key=lambda record: -record['seconds'])
+        return {
+            'prompts': len(self.prompts),
+            'seconds': sum(record['seconds'] for record in self.prompts),
+            'combos': sum(record['combos'] for record in self.prompts),
+            'size_histogram': [{'size': size,
+                                'prompts': sizes[size],
+                                'seconds': size_seconds[size]}
+                               for size in sorted(sizes)],
+            'slowest': slowest[:top],
+        }
+
+
+    def write(self, output_file, top=20):
+        """
+        Write the summary to a JSON file
+        """
+        with open(output_file, 'w') as f:
+            json.dump(self.summary(top), f, indent=2)
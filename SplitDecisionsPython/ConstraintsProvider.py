@@ -0,0 +1,109 @@
+"""
+Sam Taylor
+October 18 2026
+"""
+
+import shelve
+from collections import OrderedDict
+import SplitDecisionsUtil as sdu
+from ConstraintsFinder import constrain_prompt_bits
+from PromptIndex import PromptIndex
+
+class ConstraintsProvider:
+    """
+    ConstraintsProvider finds constraints on demand, for a board
+    generator that only ever looks at a few of the usable word pairs.
+    The first time a word pair is asked for, the mistakeables and
+    anchors of its whole prompt are found and remembered, so nothing is
+    found for prompts that never come up.
+    word_pairs - every word pair (usable or not) constraints are found
+                 from. These are never changed; only the word pairs
+                 passed to get get constraints filled in.
+    min_usability - word pairs less usable than this only constrain
+                    the usable ones
+    max_prompts - most prompts to remember at once. The prompts used
+                  least recently are forgotten first.
+    path - optional file to keep constraints in between runs (with
+           shelve), so they're never found twice
+    source_key - optional key for where word_pairs came from (e.g.
+                 WordPairFinder.cache_key()). If the file at path was
+                 made from different word pairs, it's cleared.
+    Use close (or a with statement) to save everything to path.
+    """
+    def __init__(self, word_pairs, min_usability=2, max_prompts=4096,
+                 path=None, source_key=None):
+        self.word_pairs = list(word_pairs)
+        self.min_usability = min_usability
+        self.max_prompts = max_prompts
+        self._prompts = PromptIndex.from_word_pairs(self.word_pairs)
+        # Maps prompt ids to {word pair key: (mistakeables, anchors)}
+        self._memo = OrderedDict()
+        self._shelf = None
+        if path is not None:
+            self._shelf = shelve.open(path)
+            if self._shelf.get('source_key') != source_key:
+                self._shelf.clear()
+                self._shelf['source_key'] = source_key
+
+
+    def get(self, wp):
+        """
+        Get a usable word pair's (mistakeables, anchors), and fill them
+        in on the word pair too
+        """
+        constraints = self._get_prompt(wp.prompt_id).get(wp.key)
+        if constraints is None:
+            raise KeyError(f'{wp} is not a usable word pair of this provider')
+        wp.mistakeables, wp.anchors = constraints
+        return constraints
+
+
+    def _get_prompt(self, prompt_id):
+        """
+        Get the constraints of every usable word pair with a prompt,
+        from memory, from the file, or by finding them
+        """
+        constraints = self._memo.get(prompt_id)
+        if constraints is not None:
+            self._memo.move_to_end(prompt_id)
+            return constraints
+        shelf_key = str(prompt_id)
+        if self._shelf is not None and shelf_key in self._shelf:
+            constraints = self._shelf[shelf_key]
+        else:
+            prompt = [self.word_pairs[n]
+                      for n in self._prompts.rows(prompt_id).tolist()]
+            if not prompt:
+                # No word pair has this prompt, so there's nothing to
+                # find or remember
+                return {}
+            # Work from plain letters bits, so nothing is left behind on
+            # the word pairs once the prompt is forgotten
+            all_bits = [sdu.encode_letters(wp.letters) for wp in prompt]
+            usable = [wp.usability >= self.min_usability for wp in prompt]
+            constraints = {prompt[n].key: (mistakeables, anchors)
+                           for n, mistakeables, anchors
+                           in constrain_prompt_bits(all_bits, usable)}
+            if self._shelf is not None:
+                self._shelf[shelf_key] = constraints
+        self._memo[prompt_id] = constraints
+        if len(self._memo) > self.max_prompts:
+            self._memo.popitem(last=False)
+        return constraints
+
+
+    def close(self):
+        """
+        Save everything to the file, if there is one
+        """
+        if self._shelf is not None:
+            self._shelf.close()
+            self._shelf = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,127 @@
+"""
+Sam Taylor
+October 18 2026
+"""
+
+from bisect import insort
+import SplitDecisionsUtil as sdu
+from ConstraintsFinder import ConstraintsFinder
+from PromptIndex import PromptIndex
+
+class ConstraintsStore:
+    """
+    ConstraintsStore keeps every word pair's constraints by prompt, so
+    when the dictionary changes, only the prompts that changed need to
+    be constrained again. Constraints of one prompt never depend on any
+    other prompt.
+    prompts - maps each prompt id to every word pair with that prompt,
+              usable or not, sorted like WordPairFinder.find_word_pairs
+    constrained - maps each prompt id to its usable word pairs, with
+                  their mistakeables and anchors
+    stale - prompt ids whose constraints need to be found again
+    E.g. with WordPairFinder.update_words:
+        store = ConstraintsStore(word_pair_finder.word_pairs)
+        changes = word_pair_finder.update_words(added, removed)
+        changed_pairs = store.update(*changes)
+    """
+    def __init__(self, word_pairs=(), min_usability=2):
+        self.finder = ConstraintsFinder(min_usability=min_usability)
+        self.prompts = {}
+        self.constrained = {}
+        self.stale = set()
+        word_pairs = list(word_pairs)
+        for prompt in PromptIndex.from_word_pairs(word_pairs).group(word_pairs):
+            prompt.sort(key=sdu.word_pair_key)
+            self.prompts[prompt[0].prompt_id] = prompt
+        self.stale.update(self.prompts)
+        self.recompute()
+
+
+    def add(self, word_pairs):
+        """
+        Add word pairs, and mark their prompts as stale
+        """
+        for wp in word_pairs:
+            insort(self.prompts.setdefault(wp.prompt_id, []), wp,
+                   key=sdu.word_pair_key)
+            self.stale.add(wp.prompt_id)
+
+
+    def remove(self, word_pairs):
+        """
+        Remove word pairs, and mark their prompts as stale
+        """
+        for wp in word_pairs:
+            prompt = self.prompts.get(wp.prompt_id, [])
+            if wp in prompt:
+                prompt.remove(wp)
+                self.stale.add(wp.prompt_id)
+
+
+    def invalidate(self, prompt_ids):
+        """
+        Mark prompts as stale, e.g. the prompt ids from
+        WordPairFinder.update_words
+        """
+        self.stale.update(prompt_ids)
+
+
+    def update(self, added_pairs=(), removed_pairs=(), prompt_ids=()):
+        """
+        Apply a change to the dictionary and recompute just the prompts
+        it touched. Takes the same things WordPairFinder.update_words
+        returns. Returns the usable word pairs whose anchors changed
+        (see recompute).
+        """
+        self.remove(removed_pairs)
+        self.add(added_pairs)
+        self.invalidate(prompt_ids)
+        return self.recompute()
+
+
+    def recompute(self, prompt_ids=None):
+        """
+        Find constraints again for the given prompts (by default, every
+        stale prompt). Returns the usable word pairs whose anchors
+        changed, including ones that are new to the store, in order of
+        prompt id.
+        """
+        if prompt_ids is None:
+            prompt_ids = self.stale
+        changed = []
+        for prompt_id in sorted(prompt_ids):
+            self.stale.discard(prompt_id)
+            old_anchors = {wp.key: wp.anchors
+                           for wp in self.constrained.pop(prompt_id, [])}
+            prompt = self.prompts.get(prompt_id)
+            if not prompt:
+                self.prompts.pop(prompt_id, None)
+                continue
+            constrained = list(self.finder.iter_constraints(prompt))
+            if constrained:
+                self.constrained[prompt_id] = constrained
+            for wp in constrained:
+                if old_anchors.get(wp.key) != wp.anchors:
+                    changed.append(wp)
+        return changed
+
+
+    def get(self, prompt_id):
+        """
+        Get the constrained (usable) word pairs with the given prompt
+        id. Stale prompts are recomputed first.
+        """
+        if prompt_id in self.stale:
+            self.recompute([prompt_id])
+        return self.constrained.get(prompt_id, [])
+
+
+    def word_pairs(self):
+        """
+        Every constrained word pair, in order of prompt id. Stale
+        prompts are recomputed first.
+        """
+        if self.stale:
+            self.recompute()
+        return [wp for prompt_id in sorted(self.constrained)
+                for wp in self.constrained[prompt_id]]
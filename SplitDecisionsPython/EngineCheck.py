@@ -0,0 +1,103 @@
+"""
+Sam Taylor
+October 18 2026
+
+Check that every word pair finder engine finds exactly the same word
+pairs.
+
+Every engine (and the numpy engine on a packed copy of the dictionary)
+is run on the same dictionaries, and its word pairs are compared with
+the rotation engine's, pair by pair and in order. Any difference is
+printed, and the exit status is 1 if there are any.
+
+E.g.
+    python EngineCheck.py
+    python EngineCheck.py --dictionaries ReferenceDictionary.txt \
+        --usable UsableDictionary.txt
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from PackedDictionary import PackedDictionary
+from WordPairFinder import WordPairFinder
+
+TEXT_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'outdated', 'SplitDecPuzzlePy', 'TextFiles')
+
+
+def find_word_pairs(words_file, usable_words_file, engine):
+    """
+    Find word pairs with one engine, as (repr, usability) tuples in the
+    order the finder gives them
+    """
+    finder = WordPairFinder(words_file=words_file,
+                            usable_words_file=usable_words_file,
+                            engine=engine)
+    return [(f'{wp}', wp.usability) for wp in finder.find_word_pairs()]
+
+
+def compare(expected, found):
+    """
+    Describe the first difference between two lists of word pairs, or
+    return None if they're the same
+    """
+    if found == expected:
+        return None
+    for n, (old, new) in enumerate(zip(expected, found)):
+        if old != new:
+            return f'word pair {n}: expected {old}, found {new}'
+    return f'expected {len(expected)} word pairs, found {len(found)}'
+
+
+def check(words_file, usable_words_file, temp_dir):
+    """
+    Compare every engine with the rotation engine on one dictionary.
+    Returns a list of failures.
+    """
+    expected = find_word_pairs(words_file, usable_words_file, 'rotation')
+    cases = [(engine, words_file) for engine in sorted(WordPairFinder.ENGINES)
+             if engine != 'rotation']
+    packed_file = os.path.join(temp_dir,
+                               f'{os.path.basename(words_file)}.sdd')
+    PackedDictionary.convert(words_file, packed_file)
+    cases.append(('numpy (packed)', packed_file))
+    failures = []
+    for name, case_file in cases:
+        engine = name.split()[0]
+        difference = compare(expected,
+                             find_word_pairs(case_file, usable_words_file, engine))
+        status = 'ok' if difference is None else f'FAILED {difference}'
+        print(f'{os.path.basename(words_file):>40} {name:>16}  '
+              f'{len(expected)} word pairs  {status}')
+        if difference is not None:
+            failures.append(f'{words_file} [{name}] {difference}')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--dictionaries', nargs='+',
+                        default=['google-10000-english-usa-no-swears.txt'],
+                        help='dictionaries in the bundled TextFiles folder')
+    parser.add_argument('--usable',
+                        help='usable dictionary in the bundled TextFiles '
+                             'folder')
+    args = parser.parse_args()
+
+    usable_words_file = None
+    if args.usable:
+        usable_words_file = os.path.join(TEXT_FILES, args.usable)
+    failures = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name in args.dictionaries:
+            failures.extend(check(os.path.join(TEXT_FILES, name),
+                                  usable_words_file,
+                                  temp_dir))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Sam Taylor
+October 18 2026
+
+Packed binary dictionaries, so that loading a dictionary doesn't need
+any text parsing.
+
+A packed dictionary is a small header followed by one partition per
+word length. Each partition is every word of that length, back to back
+with no separators, so a partition of n words of length L is just an
+(n x L) array of bytes:
+
+    magic            4s  b'SDPD'
+    version          H
+    partition count  H
+    for each partition:
+        length       H
+        word count   I
+        offset       Q   (from the start of the file)
+    partitions...
+
+To convert a text dictionary (one word per line):
+    python PackedDictionary.py words.txt words.sdd
+"""
+
+import struct
+import sys
+import numpy as np
+
+MAGIC = b'SDPD'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+PARTITION = struct.Struct('<HIQ')
+
+
+class PackedDictionary:
+    """
+    PackedDictionary memory-maps a packed dictionary file. Words are
+    read straight out of the file as numpy uint8 views, so nothing is
+    copied until a partition is actually used.
+    path - path to the packed dictionary file
+    partitions - maps each word length to (offset, word count)
+    """
+    def __init__(self, path):
+        self.path = path
+        self._data = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, version, partition_count = HEADER.unpack_from(self._data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a packed dictionary')
+        self.partitions = {}
+        for p in range(partition_count):
+            length, count, offset = PARTITION.unpack_from(
+                self._data, HEADER.size + p * PARTITION.size)
+            self.partitions[length] = (offset, count)
+
+
+    @staticmethod
+    def is_packed(path):
+        """
+        Check whether a file is a packed dictionary (as opposed to a
+        text dictionary)
+        """
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+
+
+    @staticmethod
+    def convert(words_file, packed_file):
+        """
+        Convert a text dictionary with one word per line into a packed
+        dictionary. Words keep their order within each length.
+        """
+        words_by_length = {}
+        with open(words_file, 'r') as f:
+            for line in f:
+                word = line.strip()
+                if word:
+                    words_by_length.setdefault(len(word), []).append(word)
+        lengths = sorted(words_by_length)
+        offset = HEADER.size + len(lengths) * PARTITION.size
+        with open(packed_file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(lengths)))
+            for length in lengths:
+                count = len(words_by_length[length])
+                f.write(PARTITION.pack(length, count, offset))
+                offset += length * count
+            for length in lengths:
+                f.write(''.join(words_by_length[length]).encode('ascii'))
+
+
+    def lengths(self):
+        """
+        Every word length in the dictionary, shortest first
+        """
+        return sorted(self.partitions)
+
+
+    def words(self, length):
+        """
+        All words of a given length as an (n x length) uint8 array.
+        This is a view into the file, not a copy.
+        """
+        offset, count = self.partitions.get(length, (0, 0))
+        return self._data[offset:offset + length * count].reshape(count, length)
+
+
+    def word_list(self, min_word_length=1, max_word_length=None):
+        """
+        Words as a list of strs, shortest first, optionally limited to
+        a range of lengths
+        """
+        words = []
+        for length in self.lengths():
+            if length < min_word_length:
+                continue
+            if max_word_length is not None and length > max_word_length:
+                break
+            letters = self.words(length).tobytes().decode('ascii')
+            words.extend(letters[i:i + length]
+                         for i in range(0, len(letters), length))
+        return words
+
+
+    def __len__(self):
+        return sum(count for _, count in self.partitions.values())
+
+
+def main():
+    if len(sys.argv) != 3:
+        print('usage: python PackedDictionary.py words.txt words.sdd')
+        sys.exit(1)
+    PackedDictionary.convert(sys.argv[1], sys.argv[2])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Sam Taylor
+October 18 2026
+"""
+
+from PromptIndex import PromptIndex
+from Shape import Shape
+
+class PairIndex:
+    """
+    PairIndex answers the question a board generator keeps asking when
+    filling a slot: "which usable word pairs have this length and split
+    index, and these letters at these positions?"
+    Every shape gets its own list of usable word pairs, and every
+    (shape, position, letter) gets a bitset over that list, where bit n
+    is 1 if word pair n has that letter at that position. A query with
+    several letters is then just a few bitwise ands.
+    Positions are positions in the word, and only the letters outside
+    the split can be queried, since those are the only letters the two
+    words share.
+    Usable word pairs can also be looked up by prompt.
+    word_pairs - maps each shape value to its list of usable word pairs
+    """
+    def __init__(self, word_pairs, min_usability=2):
+        self.word_pairs = {}
+        for wp in word_pairs:
+            if wp.usability < min_usability:
+                continue
+            self.word_pairs.setdefault(wp.shape.value, []).append(wp)
+        self._bits = {}
+        for shape_value, shape_pairs in self.word_pairs.items():
+            # Collect the ids of word pairs for each position and
+            # letter first, then build each bitset in one go. Or-ing
+            # bits into a big int one at a time would copy it each time.
+            ids = {}
+            for n, wp in enumerate(shape_pairs):
+                for position, letter in self._positions(wp):
+                    ids.setdefault((position, letter), []).append(n)
+            for (position, letter), pair_ids in ids.items():
+                bitset = bytearray((len(shape_pairs) + 7) // 8)
+                for n in pair_ids:
+                    bitset[n >> 3] |= 1 << (n & 7)
+                self._bits[(shape_value, position, letter)] = int.from_bytes(
+                    bitset, 'little')
+        self._all = [wp for shape_value in sorted(self.word_pairs)
+                     for wp in self.word_pairs[shape_value]]
+        self._prompts = PromptIndex.from_word_pairs(self._all)
+
+
+    @staticmethod
+    def _positions(wp):
+        """
+        Yield (position in the word, letter) for every letter outside
+        of the split
+        """
+        index = wp.shape.index
+        for position, letter in enumerate(wp.before):
+            yield position, letter
+        for position, letter in enumerate(wp.after, index + 2):
+            yield position, letter
+
+
+    def query(self, length, index, letters=None):
+        """
+        Get every usable word pair with the given length and split
+        index, with the given letters at the given positions.
+        letters maps positions in the word to letters, e.g. {0: 'e'}
+        """
+        shape_value = Shape.get(length, index).value
+        shape_pairs = self.word_pairs.get(shape_value, [])
+        matches = self._match(shape_value, length, index, letters)
+        if matches is None:
+            return list(shape_pairs)
+        results = []
+        while matches:
+            lowest = matches & -matches
+            results.append(shape_pairs[lowest.bit_length() - 1])
+            matches ^= lowest
+        return results
+
+
+    def count(self, length, index, letters=None):
+        """
+        Count the word pairs that query would return, without building
+        the list
+        """
+        shape_value = Shape.get(length, index).value
+        matches = self._match(shape_value, length, index, letters)
+        if matches is None:
+            return len(self.word_pairs.get(shape_value, []))
+        return matches.bit_count()
+
+
+    def query_prompt(self, prompt_id):
+        """
+        Get every usable word pair with the given prompt id (see
+        WordPair.prompt_id)
+        """
+        return [self._all[n] for n in self._prompts.rows(prompt_id).tolist()]
+
+
+    def _match(self, shape_value, length, index, letters):
+        """
+        And together the bitsets for every letter in letters. Returns
+        None if there are no letters to match, meaning everything
+        matches.
+        """
+        if not letters:
+            return None
+        matches = None
+        for position, letter in letters.items():
+            if position in (index, index + 1) or not 0 <= position < length:
+                raise ValueError(f'Position {position} is not outside the '
+                                 f'split of shape ({length}, {index})')
+            bits = self._bits.get((shape_value, position, letter), 0)
+            matches = bits if matches is None else matches & bits
+            if not matches:
+                break
+        return matches
@@ -0,0 +1,74 @@
+"""
+Sam Taylor
+October 18 2026
+"""
+
+import numpy as np
+
+class PromptIndex:
+    """
+    PromptIndex groups items (word pairs, or rows of a WordPairTable) by
+    prompt id. All the grouping is one stable argsort and one np.unique,
+    so every prompt's items end up in one contiguous slice, in the
+    order they were given.
+    order - item numbers, sorted by prompt id
+    prompt_ids - every distinct prompt id, in order
+    starts - prompt n's items are order[starts[n]:stops[n]]
+    stops - see starts
+    """
+    def __init__(self, prompt_ids):
+        prompt_ids = np.asarray(prompt_ids, dtype=np.int64)
+        self.order = np.argsort(prompt_ids, kind='stable')
+        self.prompt_ids, self.starts = np.unique(prompt_ids[self.order],
+                                                 return_index=True)
+        self.stops = np.append(self.starts[1:], len(self.order))
+
+
+    @classmethod
+    def from_word_pairs(cls, word_pairs):
+        """
+        Make an index over a list of word pairs
+        """
+        return cls(np.fromiter((wp.prompt_id for wp in word_pairs),
+                               dtype=np.int64, count=len(word_pairs)))
+
+
+    def rows(self, prompt_id):
+        """
+        Get the item numbers with the given prompt id, in order. Empty
+        if no item has that prompt id.
+        """
+        n = np.searchsorted(self.prompt_ids, prompt_id)
+        if n == len(self.prompt_ids) or self.prompt_ids[n] != prompt_id:
+            return self.order[:0]
+        return self.order[self.starts[n]:self.stops[n]]
+
+
+    def slices(self):
+        """
+        Yield (prompt id, start, stop) for every prompt, in order of
+        prompt id, as plain ints. The prompt's items are
+        order[start:stop].
+        """
+        yield from zip(self.prompt_ids.tolist(),
+                       self.starts.tolist(),
+                       self.stops.tolist())
+
+
+    def group(self, items):
+        """
+        Yield a list of the items with each prompt id, in order of
+        prompt id. items is what the index was made from (or anything
+        else in the same order).
+        """
+        order = self.order.tolist()
+        for _, start, stop in self.slices():
+            yield [items[n] for n in order[start:stop]]
+
+
+    def __len__(self):
+        return len(self.prompt_ids)
+
+
+    def __contains__(self, prompt_id):
+        return len(self.rows(prompt_id)) > 0
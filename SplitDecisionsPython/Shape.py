@@ -3,6 +3,10 @@ Sam Taylor
 October 12 2024
 """
 
+# Every shape gets its own block of prompt ids, one for each possible
+# combination of the 4 letters in a prompt's split
+PROMPTS_PER_SHAPE = 26 ** 4
+
 class Shape:
     """
     Shape class is basically a container for the length of a word pair
@@ -10,9 +14,69 @@ class Shape:
     length - length of the word pair
     index - index of the start of the split in the word pair
     value - int representation of length and index, such that each
-            combination of length and index gets its own unique value
+            combination of length and index gets its own unique value.
+            Values count up from 0 with no gaps, by length then index.
+    letter_count - number of letters outside of the split
+    prompt_ids - range of prompt ids that word pairs with this shape
+                 can have
+    There only needs to be one Shape for each length and index, so use
+    Shape.get to get it from the catalog instead of making a new one.
     """
+    __slots__ = ('length', 'index', 'value', 'letter_count', 'prompt_ids')
+    _catalog = []
+
     def __init__(self, length, index):
         self.length = length
         self.index = index
-        self.value = length * (length - 3) / 2 + index
\ No newline at end of file
+        self.value = length * (length - 3) // 2 + index
+        self.letter_count = length - 2
+        first_prompt_id = self.value * PROMPTS_PER_SHAPE
+        self.prompt_ids = range(first_prompt_id,
+                                first_prompt_id + PROMPTS_PER_SHAPE)
+
+    @classmethod
+    def get(cls, length, index):
+        """
+        Get the Shape for a length and index from the catalog
+        """
+        if length < 3 or not 0 <= index <= length - 2:
+            raise ValueError(f'There is no shape with length {length} '
+                             f'and index {index}')
+        value = length * (length - 3) // 2 + index
+        # Longer shapes are added to the catalog as they're needed
+        while len(cls._catalog) <= value:
+            next_length = cls._catalog[-1].length + 1 if cls._catalog else 3
+            cls._catalog.extend(Shape(next_length, i)
+                                for i in range(next_length - 1))
+        return cls._catalog[value]
+
+    @staticmethod
+    def count(max_length=12):
+        """
+        Number of shapes with lengths from 3 up to max_length. This is
+        also the number of shape values, since they have no gaps.
+        """
+        return (max_length + 1) * (max_length - 2) // 2
+
+    @classmethod
+    def catalog(cls, max_length=12):
+        """
+        Every shape with lengths from 3 up to max_length, in order of
+        value, so catalog[value] is the shape with that value
+        """
+        cls.get(max_length, max_length - 2)
+        return cls._catalog[:cls.count(max_length)]
+
+    @classmethod
+    def count_pairs(cls, word_pairs, max_length=12):
+        """
+        Count the word pairs of each shape. counts[value] is the number
+        of word pairs with that shape value.
+        """
+        counts = [0] * cls.count(max_length)
+        for wp in word_pairs:
+            counts[wp.shape.value] += 1
+        return counts
+
+# Fill in the catalog for the usual lengths up front
+Shape.catalog(12)
@@ -6,66 +6,59 @@ Functions for generating Split Decisions puzzles
 """
 
 import numpy as np
+from itertools import groupby
 
 
-def compare_shapes(shape1, shape2):
+# Sort keys. Each one turns an item into something that sorts in the
+# right order on its own, so it only gets computed once per item, and
+# all the comparing happens in C.
+
+def word_pair_key(wp):
     """
-    Compare shapes by their value. This is the same as comparing by
-    length, then by index.
+    Sort word pairs for internal organization:
+    sort by shape, then by prompt, then by solution
     """
-    if shape1.value < shape2.value:
-        return -1
-    if shape1.value > shape2.value:
-        return 1
-    return 0
+    return (wp.shape.value, wp.splits[0], wp.splits[1], wp.letters)
 
 
-def compare_word_pairs(wp1, wp2):
+def word_pair_prompt_key(wp):
     """
-    Compare word pairs for internal organization:
-    compare by shape, then by prompt, then by solution
+    Sort or group word pairs by prompt
     """
-    compare_shapes_result = compare_shapes(wp1.shape, wp2.shape)
-    if (compare_shapes_result) != 0:
-        return compare_shapes_result
-    for wp1_split, wp2_split in zip(wp1.splits, wp2.splits):
-        if wp1_split < wp2_split:
-            return -1
-        if wp1_split > wp2_split:
-            return 1
-    if wp1.letters < wp2.letters:
-        return -1
-    if wp1.letters > wp2.letters:
-        return 1
-    return 0
+    return wp.prompt_id
 
 
-def compare_word_pairs_by_prompt(wp1, wp2):
+def word_pair_display_key(wp):
     """
-    Compare word pairs by prompt
+    Sort word pairs for easy display:
+    sort by shape, then alphabetically
     """
-    if wp1.prompt_id < wp2.prompt_id:
-        return -1
-    if wp1.prompt_id < wp2.prompt_id:
-        return 1
-    return 0
+    return (wp.shape.value, f'{wp}')
 
 
-def compare_word_pairs_display(wp1, wp2):
+def iter_display_order(word_pairs):
     """
-    Compare word pairs for easy display:
-    compare by shape, then alphabetically
+    Sort a stream of word pairs for easy display, one shape at a time.
+    The word pairs must already be grouped by shape in order of shape,
+    like the output of WordPairFinder.iter_word_pairs.
     """
-    compare_shapes_result = compare_shapes(wp1.shape, wp2.shape)
-    if (compare_shapes_result) != 0:
-        return compare_shapes_result
-    wp1str = f'{wp1}'
-    wp2str = f'{wp2}'
-    if wp1str < wp2str:
-        return -1
-    if wp1str > wp2str:
-        return 1
-    return 0
+    for _, shape_pairs in groupby(word_pairs, key=lambda wp: wp.shape.value):
+        yield from sorted(shape_pairs, key=word_pair_display_key)
+
+
+def pack_letters(letters, packed=0):
+    """
+    Pack a string of lowercase letters into an int, 5 bits per letter,
+    with the first letter in the highest bits. If packed is given, the
+    letters are packed in after it. Raises ValueError (from to_codes)
+    if any character isn't a to z.
+
+    E.g.  ab -> b 00000 00001
+    E.g. cab -> b 00010 00000 00001
+    """
+    for code in to_codes(letters):
+        packed = (packed << 5) | code
+    return packed
 
 
 def encode(letter):
@@ -88,4 +81,85 @@ def decode (code):
 
     E.g. b 00 0000 0000 0000 0000 0000 1111 -> abcd
     """
-    return [chr(ord('a') + i) for i in range(26) if code & (1 << i)]
\ No newline at end of file
+    return list(decode_letters(code))
+
+
+# Shared letter encodings. Everything here works on whole strings or
+# arrays at once, with lookup tables, instead of one letter at a time
+# with ord and chr.
+#
+# Letter codes: a -> 0, b -> 1, ..., z -> 25
+# Letter bits: a -> 1 << 0, b -> 1 << 1, ..., z -> 1 << 25 (see encode)
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+# Every byte that isn't a lowercase letter translates to 255, so it can
+# never pass for a letter code
+_TO_CODES = bytes(ALPHABET.index(chr(byte)) if chr(byte) in ALPHABET else 255
+                  for byte in range(256))
+_FROM_CODES = bytes.maketrans(bytes(range(26)), ALPHABET.encode('ascii'))
+# Letter bits for each letter code. Anything that isn't a letter code
+# (like padding) has no bits.
+LETTER_BITS = np.zeros(256, dtype=np.uint32)
+LETTER_BITS[:26] = np.left_shift(np.uint32(1), np.arange(26, dtype=np.uint32))
+_LETTER_BITS_LIST = LETTER_BITS.tolist()
+# Letters for every 13-bit half of a 26-bit letter mask
+_HALF_MASK = (1 << 13) - 1
+_LOW_LETTERS = [''.join(ALPHABET[i] for i in range(13) if mask & (1 << i))
+                for mask in range(_HALF_MASK + 1)]
+_HIGH_LETTERS = [''.join(ALPHABET[i + 13] for i in range(13) if mask & (1 << i))
+                 for mask in range(_HALF_MASK + 1)]
+
+
+def to_codes(letters):
+    """
+    Convert a string of lowercase letters to bytes of letter codes.
+    Raises ValueError if anything in the string isn't a lowercase
+    letter (e.g. an uppercase word from another dictionary), since
+    it would have no letter code.
+
+    E.g. cab -> b'\x02\x00\x01'
+    """
+    try:
+        codes = letters.encode('ascii').translate(_TO_CODES)
+    except UnicodeEncodeError:
+        codes = None
+    # Anything that isn't a lowercase letter translates to 255
+    if codes is None or (codes and max(codes) > 25):
+        raise ValueError(f'{letters!r} has characters other than '
+                         f'lowercase a to z')
+    return codes
+
+
+def from_codes(codes):
+    """
+    Convert letter codes (bytes, or a uint8 array) back to a string
+    """
+    return bytes(codes).translate(_FROM_CODES).decode('ascii')
+
+
+def encode_words(words, length):
+    """
+    Convert a list of words that are all the same length into an
+    (n x length) uint8 array of letter codes, all at once
+    """
+    codes = to_codes(''.join(words))
+    return np.frombuffer(codes, dtype=np.uint8).reshape(len(words), length)
+
+
+def encode_letters(letters):
+    """
+    Encode every letter in a string like encode does, as a list
+
+    E.g. cab -> [4, 1, 2]
+    """
+    return [_LETTER_BITS_LIST[code] for code in to_codes(letters)]
+
+
+def decode_letters(code):
+    """
+    Same as decode, but as a string
+
+    E.g. b 00 0000 0000 0000 0000 0000 1111 -> 'abcd'
+    """
+    code = int(code)
+    return _LOW_LETTERS[code & _HALF_MASK] + _HIGH_LETTERS[code >> 13]
\ No newline at end of file
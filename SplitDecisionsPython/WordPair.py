@@ -4,6 +4,7 @@ October 10 2024
 """
 
 import SplitDecisionsUtil as sdu 
+from Shape import PROMPTS_PER_SHAPE
 
 class WordPair:
     """
@@ -17,6 +18,10 @@ class WordPair:
                 be candidates for board generation, some just help
                 verify that a board will have one unique solution.
     """
+    __slots__ = ('shape', 'words', 'splits', 'before', 'after', 'letters',
+                 'mistakeables', 'anchors', 'usability',
+                 '_prompt', '_prompt_id', '_letters_bits', '_items', '_key')
+
     def __init__(self, shape, word1, word2, usability=2):
         self.shape = shape
         self.words = [word1, word2]
@@ -26,16 +31,56 @@ class WordPair:
         self.before = word1[:shape.index]
         self.after = word1[shape.index + 2:]
         self.letters = self.before + self.after
-        self.letters_bits = [sdu.encode(letter) for letter in self.letters]
-        self._items = [letter for letter in self.before]
-        self._items.extend([self.splits[0]])
-        self._items.extend([self.splits[1]])
-        self._items.extend([letter for letter in self.after])
         self.mistakeables = []
         self.anchors = []
         self.usability = usability
-        self.prompt = self._get_prompt()
-        self.prompt_id = self._get_prompt_id()
+        # Most word pairs are only ever used for reference, so the rest
+        # is only worked out the first time it's needed
+        self._prompt = None
+        self._prompt_id = None
+        self._letters_bits = None
+        self._items = None
+        self._key = None
+
+    @property
+    def prompt(self):
+        if self._prompt is None:
+            self._prompt = self._get_prompt()
+        return self._prompt
+
+    @property
+    def prompt_id(self):
+        if self._prompt_id is None:
+            self._prompt_id = self._get_prompt_id()
+        return self._prompt_id
+
+    @property
+    def key(self):
+        """
+        Canonical int for this word pair: its shape value, then 5 bits
+        for each letter of word1, then 5 bits for each letter of
+        word2's split. The shape fixes the length, so no two word pairs
+        share a key. Equal word pairs have equal keys, and hash the
+        same. Raises ValueError if the words have any character other
+        than a to z.
+        """
+        if self._key is None:
+            key = sdu.pack_letters(self.words[0], self.shape.value)
+            self._key = sdu.pack_letters(self.splits[1], key)
+        return self._key
+
+    @property
+    def letters_bits(self):
+        if self._letters_bits is None:
+            self._letters_bits = sdu.encode_letters(self.letters)
+        return self._letters_bits
+
+    def _get_items(self):
+        items = [letter for letter in self.before]
+        items.extend([self.splits[0]])
+        items.extend([self.splits[1]])
+        items.extend([letter for letter in self.after])
+        return items
 
     def _get_prompt(self):
         split1, split2 = self.splits
@@ -50,12 +95,10 @@ class WordPair:
         and I think with 12 letters there's 78 shapes?
         That's a lot, but not impossible
         """
-        # character_id_n = ord(self.splits[?] - ord('a') * 26^(n-1))
-        character_id = (ord(self.splits[0][0]) - 97)
-        character_id += (ord(self.splits[0][1]) - 97) * 26
-        character_id += (ord(self.splits[1][0]) - 97) * 676
-        character_id += (ord(self.splits[1][1]) - 97) * 17576
-        shape_id = self.shape.value * 456976
+        # character_id_n = code(split letter n) * 26^(n-1)
+        s0, s1, s2, s3 = sdu.to_codes(self.splits[0] + self.splits[1])
+        character_id = s0 + s1 * 26 + s2 * 676 + s3 * 17576
+        shape_id = self.shape.value * PROMPTS_PER_SHAPE
         return character_id + shape_id
 
     def show_mistakeables(self):
@@ -64,23 +107,21 @@ class WordPair:
             if not letter_mistakeables:
                 mistakeables_strs.append('-')
                 continue
-            letters = ''.join(sdu.decode(letter_mistakeables))
-            mistakeables_strs.append(letters)
+            mistakeables_strs.append(sdu.decode_letters(letter_mistakeables))
         s = ', '.join(mistakeables_strs)
         return f'[{s}]'
 
     def show_anchors(self):
         anchor_strs = []
+        spec = f'0{len(self.letters)}b'
         for anchor in self.anchors:
-            a = ''
-            length = len(self.letters)
-            for i in range(length):
-                a += str(int((anchor & (1 << (length - i - 1))) > 0))
-            anchor_strs.append(a)
+            anchor_strs.append(format(anchor, spec))
         s = ', '.join(anchor_strs)
         return f'[{s}]'
 
     def __getitem__(self, key):
+        if self._items is None:
+            self._items = self._get_items()
         return self._items[key]
     
     def __repr__(self):
@@ -88,6 +129,9 @@ class WordPair:
         return f'{self.before}({split1}/{split2}){self.after}'
     
     def __eq__(self, other):
-        return (self.shape == other.shape
-                and self.words[0] == other.words[0]
-                and self.words[1] == other.words[1])
\ No newline at end of file
+        if not isinstance(other, WordPair):
+            return NotImplemented
+        return self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
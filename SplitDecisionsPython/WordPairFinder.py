@@ -3,35 +3,479 @@ Sam Taylor
 October 12 2024
 """
 
-from functools import cmp_to_key
+from bisect import bisect_left, insort
+from multiprocessing import Pool
+from ArtifactCache import ArtifactCache
+from PackedDictionary import PackedDictionary
 from WordPair import WordPair
+from WordPairTable import WordPairTable
 from Shape import Shape
 import SplitDecisionsUtil as sdu
+import WordPairWriter as wpw
+import numpy as np
 
 class WordPairFinder:
     def __init__(self, *,
                  words_file,
                  usable_words_file=None,
                  min_word_length=3,
-                 max_word_length=12):
+                 max_word_length=12,
+                 engine='rotation',
+                 processes=1,
+                 cache=None):
+        if engine not in self.ENGINES:
+            raise ValueError(f'Unknown word pair engine {engine!r}, '
+                             f'expected one of {sorted(self.ENGINES)}')
         self.words_file = words_file
         self.usable_words_file = usable_words_file
         self.min_word_length = min_word_length
         self.max_word_length = max_word_length
+        self.engine = engine
+        self.processes = processes
+        self.cache = cache
         self.word_pairs = []
+        # Whether self.word_pairs are every word pair of the
+        # dictionaries, so update_words can update them
+        self._found = False
+        # min_usability of find_usable_word_pairs, if self.word_pairs
+        # are only the word pairs it found, otherwise None
+        self._min_usability = None
+        # Words (and their usability) that self.word_pairs were found
+        # from, and buckets of those words for incremental updates.
+        # Both are only loaded when update_words needs them.
+        self._words = None
+        self._buckets = None
 
 
-    def write_word_pairs_to_file(self, output_file):
-        wp_display = [wp for wp in self.word_pairs]
-        wp_display.sort(key=cmp_to_key(sdu.compare_word_pairs_display))
-        with open(output_file, 'w+') as f:
-            for word_pair in wp_display:
-                f.write(f'{word_pair}  [{word_pair.usability}]\n')
+    def write_word_pairs_to_file(self, output_file, word_pairs=None,
+                                 binary=False, by_prompt=False):
+        """
+        Write word pairs to a file for display. By default, write all
+        of this finder's word pairs. A stream of word pairs (e.g. from
+        iter_word_pairs) can be written instead, as long as it's
+        grouped by shape in order of shape.
+        If binary is True, write a compact binary file instead, which
+        WordPairWriter.read_word_pairs_binary can load back. If
+        by_prompt is also True, the binary file is grouped by prompt in
+        order of prompt id.
+        """
+        if binary:
+            wpw.write_word_pairs_binary(
+                self.word_pairs if word_pairs is None else word_pairs,
+                output_file, by_prompt=by_prompt)
+        elif word_pairs is None:
+            wpw.write_word_pairs(self.word_pairs, output_file,
+                                 wpw.format_usability)
+        else:
+            wpw.write_word_pairs(word_pairs, output_file,
+                                 wpw.format_usability, grouped=True)
 
 
     def find_word_pairs(self):
         """
-        Find word pairs
+        Find word pairs, using whichever engine this finder was
+        created with
+        """
+        self._found = True
+        self._min_usability = None
+        self._words = None
+        self._buckets = None
+        if self.cache is None:
+            self.word_pairs.extend(self._iter_word_pairs())
+            return self.word_pairs
+        # The cache holds a table, in the same order as the word pairs.
+        # The dictionaries aren't read at all on a cache hit, unless
+        # update_words needs them.
+        self.word_pairs.extend(self.find_word_pair_table().word_pairs())
+        return self.word_pairs
+
+
+    def cache_key(self):
+        """
+        Key for this finder's word pairs in an ArtifactCache. Every
+        engine finds the same word pairs, so only the dictionaries and
+        word lengths go into the key, plus the min_usability of
+        find_usable_word_pairs if that's what found them, since those
+        are only part of the word pairs.
+        """
+        return self._cache_key(self._min_usability)
+
+
+    def _cache_key(self, min_usability=None):
+        """
+        Same as cache_key, for every word pair (if min_usability is
+        None) or for find_usable_word_pairs's
+        """
+        usable_digest = None
+        if self.usable_words_file:
+            usable_digest = ArtifactCache.file_digest(self.usable_words_file)
+        parts = ['WordPairFinder',
+                 ArtifactCache.file_digest(self.words_file),
+                 usable_digest,
+                 self.min_word_length,
+                 self.max_word_length]
+        if min_usability is not None:
+            parts.append(('usable', min_usability))
+        return ArtifactCache.make_key(*parts)
+
+
+    def update_words(self, added=None, removed=None):
+        """
+        Update the word pairs for a change to the dictionary, without
+        finding every word pair all over again. added maps words to
+        their usability (0 or 1), for new words and for words whose
+        usability changed. removed is any iterable of words.
+        self.word_pairs stays sorted, same as after find_word_pairs.
+
+        Returns a tuple of the word pairs that were added, the word
+        pairs that were removed, and the sorted prompt ids of every
+        prompt that either touched. A usability change shows up as its
+        word pairs being removed and then added again.
+        """
+        if not self._found:
+            raise RuntimeError('find_word_pairs must run before '
+                               'update_words')
+        if self._words is None:
+            self._words = dict(self._read_words())
+        if self._buckets is None:
+            self._buckets = {}
+            for word in self._words:
+                self._bucket_word(word)
+        added = added or {}
+        removed_pairs = []
+        for word in list(removed or []) + list(added):
+            removed_pairs.extend(self._remove_word(word))
+        added_pairs = []
+        for word, usability in added.items():
+            if (len(word) < self.min_word_length
+                or len(word) > self.max_word_length):
+                continue
+            added_pairs.extend(self._add_word(word, usability))
+        prompt_ids = {wp.prompt_id for wp in added_pairs}
+        prompt_ids.update(wp.prompt_id for wp in removed_pairs)
+        return added_pairs, removed_pairs, sorted(prompt_ids)
+
+
+    def _bucket_word(self, word, remove=False):
+        """
+        Add a word to (or remove it from) every bucket it belongs in.
+        Buckets are the same as the bucket engine's.
+        """
+        length = len(word)
+        for index in range(length - 1):
+            key = (length, index, word[:index] + word[index + 2:])
+            if remove:
+                self._buckets[key].discard(word)
+            else:
+                self._buckets.setdefault(key, set()).add(word)
+
+
+    def _iter_partners(self, word):
+        """
+        Yield (index, word1, word2) for every bucketed word that forms
+        a word pair with word
+        """
+        length = len(word)
+        for index in range(length - 1):
+            key = (length, index, word[:index] + word[index + 2:])
+            split = word[index:index + 2]
+            for other in self._buckets.get(key, ()):
+                other_split = other[index:index + 2]
+                # Words are too similar
+                if split[0] == other_split[0] or split[1] == other_split[1]:
+                    continue
+                # word1 always has the lesser split
+                if split < other_split:
+                    yield index, word, other
+                else:
+                    yield index, other, word
+
+
+    def _add_word(self, word, usability):
+        """
+        Add a word, and return its new word pairs
+        """
+        self._words[word] = usability
+        self._bucket_word(word)
+        added_pairs = []
+        for index, word1, word2 in self._iter_partners(word):
+            word_pair = WordPair(Shape.get(len(word), index),
+                                 word1,
+                                 word2,
+                                 self._words[word1] + self._words[word2])
+            insort(self.word_pairs, word_pair, key=sdu.word_pair_key)
+            added_pairs.append(word_pair)
+        return added_pairs
+
+
+    def _remove_word(self, word):
+        """
+        Remove a word, and return the word pairs it was a part of
+        """
+        if word not in self._words:
+            return []
+        self._bucket_word(word, remove=True)
+        removed_pairs = []
+        for index, word1, word2 in self._iter_partners(word):
+            probe = sdu.word_pair_key(
+                WordPair(Shape.get(len(word), index), word1, word2))
+            i = bisect_left(self.word_pairs, probe, key=sdu.word_pair_key)
+            if (i < len(self.word_pairs)
+                and sdu.word_pair_key(self.word_pairs[i]) == probe):
+                removed_pairs.append(self.word_pairs.pop(i))
+        del self._words[word]
+        return removed_pairs
+
+
+    def iter_word_pairs(self):
+        """
+        Find word pairs without holding on to them. Word pairs are
+        yielded one shape at a time, in the same order as
+        find_word_pairs: by shape, then by prompt, then by solution.
+        So consecutive word pairs with the same prompt come out
+        together, and only one shape's worth of word pairs is held in
+        memory at a time (for the bucket engine, anyway).
+        """
+        yield from self._iter_word_pairs()
+
+
+    def _iter_word_pairs(self, words=None):
+        """
+        Find word pairs from a list of (letters, usability) tuples, or
+        from this finder's dictionaries if words is None. See
+        iter_word_pairs.
+        """
+        for length, index, shape_pairs in self._iter_shapes(words):
+            shape = Shape.get(length, index)
+            shape_pairs = [WordPair(shape,
+                                    word1,
+                                    word2,
+                                    usability)
+                           for word1, word2, usability in shape_pairs]
+            shape_pairs.sort(key=sdu.word_pair_key)
+            yield from shape_pairs
+
+
+    def find_word_pair_table(self):
+        """
+        Find word pairs as a WordPairTable, without making a WordPair
+        for each one. The table's rows are in the same order as
+        find_word_pairs. If this finder has a cache, the table's
+        columns are saved in it, and on a cache hit they're memory-
+        mapped straight back in.
+        """
+        if self.cache is None:
+            return WordPairTable.from_shapes(self._iter_shapes())
+        key = self._cache_key()
+        columns = self.cache.get_arrays(key)
+        if columns is not None:
+            return WordPairTable(**columns)
+        table = WordPairTable.from_shapes(self._iter_shapes())
+        self.cache.put_arrays(key, table.columns())
+        return table
+
+
+    def find_usable_word_pairs(self, min_usability=2):
+        """
+        Find just the word pairs that constraints need: every word pair
+        with at least min_usability (the same as ConstraintsFinder's),
+        plus the other word pairs that share a prompt with one.
+        Constraints of other prompts don't matter, so most reference
+        word pairs are never made.
+        The prompts are found first, from the usable words: word pairs
+        of two usable words (usability 2), and if min_usability is 1 or
+        less, word pairs of a usable word and a reference word
+        (usability 1). Then reference word pairs are pulled in for only
+        those prompts, through an index over the reference dictionary.
+        If min_usability is 0 or less, every word pair is found.
+        Word pairs are sorted the same way as find_word_pairs. Since
+        they're only part of the dictionary's word pairs, update_words
+        can't be used afterwards.
+        """
+        words = self._read_words()
+        self._found = False
+        self._min_usability = min_usability
+        self._words = None
+        self._buckets = None
+        if min_usability <= 0:
+            self.word_pairs.extend(self._iter_word_pairs(words))
+            return self.word_pairs
+        # Prompts of usable word pairs, as (length, index, split1, split2)
+        prompts = set()
+        if min_usability <= 2:
+            usable_words = [(letters, usability)
+                            for letters, usability in words if usability]
+            for length, index, shape_pairs in self._iter_shapes(usable_words):
+                for word1, word2, _ in shape_pairs:
+                    prompts.add((length,
+                                 index,
+                                 word1[index:index + 2],
+                                 word2[index:index + 2]))
+        if min_usability <= 1:
+            prompts.update(self._iter_mixed_prompts(words))
+        word_index = self._index_words(words, prompts)
+        word_pairs = []
+        for length, index, split1, split2 in prompts:
+            words1 = word_index[(length, index, split1)]
+            words2 = word_index[(length, index, split2)]
+            shape = Shape.get(length, index)
+            # Words with the same letters outside the split form a pair
+            for rest in words1.keys() & words2.keys():
+                word1, usability1 = words1[rest]
+                word2, usability2 = words2[rest]
+                word_pairs.append(WordPair(shape,
+                                           word1,
+                                           word2,
+                                           usability1 + usability2))
+        word_pairs.sort(key=sdu.word_pair_key)
+        self.word_pairs.extend(word_pairs)
+        return self.word_pairs
+
+
+    @staticmethod
+    def _iter_mixed_prompts(words):
+        """
+        Yield the prompt (length, index, split1, split2) of every word
+        pair of a usable word and a reference word, from (letters,
+        usability) tuples. Usable words are bucketed by the letters
+        outside each split, like the bucket engine, and only reference
+        words are looked up in the buckets.
+        """
+        usable_splits = {}
+        for letters, usability in words:
+            if not usability:
+                continue
+            length = len(letters)
+            for index in range(length - 1):
+                key = (length, index, letters[:index] + letters[index + 2:])
+                usable_splits.setdefault(key, []).append(letters[index:index + 2])
+        for letters, usability in words:
+            if usability:
+                continue
+            length = len(letters)
+            for index in range(length - 1):
+                key = (length, index, letters[:index] + letters[index + 2:])
+                split = letters[index:index + 2]
+                for other_split in usable_splits.get(key, ()):
+                    # Words are too similar
+                    if (split[0] == other_split[0]
+                        or split[1] == other_split[1]):
+                        continue
+                    # word1 always has the lesser split
+                    yield (length,
+                           index,
+                           min(split, other_split),
+                           max(split, other_split))
+
+
+    @staticmethod
+    def _index_words(words, prompts):
+        """
+        Index (letters, usability) tuples by (length, index, split),
+        but only for the splits of the given prompts. Each entry maps
+        the letters outside the split to (letters, usability).
+        """
+        keys = set()
+        indices = {}
+        for length, index, split1, split2 in prompts:
+            keys.add((length, index, split1))
+            keys.add((length, index, split2))
+            indices.setdefault(length, set()).add(index)
+        word_index = {key: {} for key in keys}
+        for letters, usability in words:
+            length = len(letters)
+            for index in indices.get(length, ()):
+                key = (length, index, letters[index:index + 2])
+                if key in keys:
+                    rest = letters[:index] + letters[index + 2:]
+                    word_index[key][rest] = (letters, usability)
+        return word_index
+
+
+    def _iter_shapes(self, words=None):
+        """
+        Run this finder's engine, in a process pool if it has more than
+        one process. Yields (length, index, [(word1, word2, usability)])
+        for each shape, in order of shape.
+        words is a list of (letters, usability) tuples. If it's None,
+        this finder's dictionaries are read. The numpy engine reads a
+        packed dictionary's words straight out of the file instead.
+        """
+        if words is None:
+            if (self.engine == 'numpy' and self.processes == 1
+                and PackedDictionary.is_packed(self.words_file)):
+                return self._find_word_pairs_packed()
+            words = self._read_words()
+        if not words:
+            return iter(())
+        if self.processes > 1:
+            return self._iter_shapes_sharded(words)
+        return self.ENGINES[self.engine](self, words)
+
+
+    def _iter_shapes_sharded(self, words):
+        """
+        Find word pairs with a process pool. Word pairs only form
+        between words of the same length, so each word length is an
+        independent shard. The biggest shards get started first, but
+        results always come back in order of shape, so the output is
+        the same no matter how many processes there are.
+        """
+        shards = {}
+        for letters, usability in words:
+            shards.setdefault(len(letters), []).append((letters, usability))
+        with Pool(self.processes) as pool:
+            results = {}
+            for length in sorted(shards, key=lambda l: -len(shards[l])):
+                results[length] = pool.apply_async(
+                    _find_shard_word_pairs,
+                    (self.engine, self.max_word_length, shards[length]))
+            for length in sorted(results):
+                yield from results[length].get()
+
+
+    def _read_words(self):
+        """
+        Read the words files into a list of (letters, usability)
+        tuples
+        """
+        # Start by putting reference words in a list
+        reference = self._read_word_list(self.words_file)
+        # If there's no separate usable dictionary, use everything
+        if not self.usable_words_file:
+            return [(word, 1) for word in reference]
+        # Get usable words as a set so we can do O(1) lookup late
+        usable = set(self._read_word_list(self.usable_words_file))
+        # Indicate usability and put in a list
+        return [(word, int(word in usable)) for word in reference]
+
+
+    def _read_word_list(self, words_file):
+        """
+        Read the words within this finder's word lengths from either a
+        text dictionary (one word per line) or a packed dictionary.
+        Packed dictionaries skip text parsing, and don't even touch
+        words of the wrong length.
+        """
+        if PackedDictionary.is_packed(words_file):
+            packed = PackedDictionary(words_file)
+            return packed.word_list(self.min_word_length,
+                                    self.max_word_length)
+        with open(words_file, 'r') as f:
+            words = [line.strip() for line in f]
+        return [word for word in words
+                if len(word) >= self.min_word_length
+                and len(word) <= self.max_word_length]
+
+
+    def _find_word_pairs_rotation(self, words):
+        """
+        Find word pairs by repeatedly sorting the words and comparing
+        neighbors, then rotating every word by one letter so that the
+        next split index ends up at the end of the word.
+        Every shape is found before any are yielded.
+        Yields (length, index, [(word1, word2, usability), ...]) for
+        each shape, in order of shape.
         """
         # Inner class and functions here for Word, a container for
         # a string and its usability
@@ -40,40 +484,16 @@ class WordPairFinder:
                 self.letters = letters
                 self.usability = usability
 
-        def compare_words(word1, word2):
+        def word_key(word):
             """
-            Compare words by length, then alphabetically
+            Sort words by length, then alphabetically (both backwards,
+            with reverse=True)
             """
-            if (len(word1.letters) > len(word2.letters)):
-                return -1
-            if (len(word1.letters) < len(word2.letters)):
-                return 1
-            if (word1.letters > word2.letters):
-                return -1
-            if (word1.letters < word2.letters):
-                return 1
-            return 0
-        
-        # Get words
-        # Start by putting reference words in a list
-        with open(self.words_file, 'r') as f:
-            reference = [line.strip() for line in f.readlines()
-                    if len(line.strip()) >= self.min_word_length
-                    and len(line.strip()) <= self.max_word_length]
-        # If there's no separate usable dictionary, use everything
-        if not self.usable_words_file:
-            words = [Word(word, 1) for word in reference]
-        else:
-            # Get usable words as a set so we can do O(1) lookup late
-            with open(self.usable_words_file, 'r') as f:
-                usable = {line.strip() for line in f.readlines()
-                        if len(line.strip()) >= self.min_word_length
-                        and len(line.strip()) <= self.max_word_length}
-            # Indicate usability and put in a list
-            words = [Word(word, int(word in usable)) for word in reference]
-
-        # Now find word pairs
-        words.sort(key=cmp_to_key(compare_words))
+            return (len(word.letters), word.letters)
+
+        word_pairs_by_shape = {}
+        words = [Word(letters, usability) for letters, usability in words]
+        words.sort(key=word_key, reverse=True)
         max_length = min(self.max_word_length, len(words[0].letters))
         # Traverse all possible rotations of words
         for r in range(max_length - 1):
@@ -81,7 +501,7 @@ class WordPairFinder:
             for i, current_word in reversed(list(enumerate(words))):
                 current_letters = current_word.letters
                 # Loop through word pair candidates
-                for next_index in range(i - 1, 0, -1):
+                for next_index in range(i - 1, -1, -1):
                     next_word = words[next_index]
                     next_letters = next_word.letters
                     # Words are too dissimilar
@@ -93,16 +513,13 @@ class WordPairFinder:
                         or current_letters[-1] == next_letters[-1]):
                         continue
                     # Words form a word pair!
-                    shape = Shape(len(current_letters),
-                                  len(current_letters) - r - 2)
+                    shape = (len(current_letters),
+                             len(current_letters) - r - 2)
                     unrotated_current = f'{current_letters[r:]}{current_letters[:r]}'
                     unrotated_next = f'{next_letters[r:]}{next_letters[:r]}'
                     usability = current_word.usability + next_word.usability
-                    word_pair = WordPair(shape,
-                                         unrotated_current,
-                                         unrotated_next,
-                                         usability)
-                    self.word_pairs.append(word_pair)
+                    word_pairs_by_shape.setdefault(shape, []).append(
+                        (unrotated_current, unrotated_next, usability))
                 # If you can't rotate a word anymore, leave it behind
                 if len(current_letters) <= r + 2:
                     # words are sorted so you don't even need to pop(i)
@@ -110,6 +527,193 @@ class WordPairFinder:
                     continue
                 # Rotate this word for next iteration
                 words[i].letters = (f'{current_letters[-1]}{current_letters[:-1]}')
-            words.sort(key=cmp_to_key(compare_words))
-        self.word_pairs.sort(key=cmp_to_key(sdu.compare_word_pairs))
-        return self.word_pairs
\ No newline at end of file
+            words.sort(key=word_key, reverse=True)
+        for length, index in sorted(word_pairs_by_shape):
+            yield length, index, word_pairs_by_shape[(length, index)]
+
+
+    def _find_word_pairs_bucket(self, words):
+        """
+        Find word pairs by bucketing words. Two words form a word pair
+        exactly when they have the same length, they match everywhere
+        outside of the split, and they differ at both letters of the
+        split. So if every word goes into a bucket keyed by its length,
+        its split index, and its letters with the split masked out,
+        then every word pair is two words in the same bucket.
+        E.g. effort and export both go in the bucket (6, 1, 'eort').
+        Yields (length, index, [(word1, word2, usability), ...]) for
+        each shape, in order of shape.
+        """
+        # Pairs only form between words of the same length
+        words_by_length = {}
+        for letters, usability in words:
+            words_by_length.setdefault(len(letters), []).append(
+                (letters, usability))
+        for length in sorted(words_by_length):
+            same_length = words_by_length[length]
+            for index in range(length - 1):
+                shape_pairs = []
+                buckets = {}
+                for letters, usability in same_length:
+                    masked = letters[:index] + letters[index + 2:]
+                    split = letters[index:index + 2]
+                    buckets.setdefault(masked, []).append(
+                        (split, letters, usability))
+                for bucket in buckets.values():
+                    if len(bucket) < 2:
+                        continue
+                    # Sort so that word1 always has the lesser split,
+                    # same as the rotation engine
+                    bucket.sort()
+                    for b, (split1, word1, usability1) in enumerate(bucket):
+                        for split2, word2, usability2 in bucket[b + 1:]:
+                            # Words are too similar
+                            if (split1[0] == split2[0]
+                                or split1[1] == split2[1]):
+                                continue
+                            # Words form a word pair!
+                            shape_pairs.append(
+                                (word1, word2, usability1 + usability2))
+                yield length, index, shape_pairs
+
+
+    def _find_word_pairs_numpy(self, words):
+        """
+        Find word pairs with numpy array operations instead of Python
+        loops. Same idea as the bucket engine, but with sorting instead
+        of hashing: for each length, words go in an (n x length) uint8
+        matrix, and for each split index the rows get sorted by every
+        column outside the split (then by the split itself). Words in
+        the same bucket end up as a run of equal rows, and any two
+        words in a run whose split letters differ at both positions
+        form a word pair.
+        Yields (length, index, [(word1, word2, usability), ...]) for
+        each shape, in order of shape.
+        """
+        # Pairs only form between words of the same length
+        words_by_length = {}
+        for letters, usability in words:
+            words_by_length.setdefault(len(letters), []).append(
+                (letters, usability))
+        for length in sorted(words_by_length):
+            same_length = words_by_length[length]
+            letters = [letters for letters, _ in same_length]
+            usabilities = np.array([usability for _, usability in same_length])
+            matrix = sdu.encode_words(letters, length)
+            for index, word1s, word2s, pair_usabilities in _iter_numpy_pairs(
+                    matrix, usabilities):
+                # Words form word pairs!
+                shape_pairs = [(letters[w1], letters[w2], usability)
+                               for w1, w2, usability in zip(word1s.tolist(),
+                                                            word2s.tolist(),
+                                                            pair_usabilities.tolist())]
+                yield length, index, shape_pairs
+
+
+    def _find_word_pairs_packed(self):
+        """
+        Same as the numpy engine, but for a packed dictionary. Each
+        length's words are used straight from the file's uint8 view,
+        without making a str for every word and encoding it again. Only
+        words that end up in a word pair are turned into strs.
+        """
+        reference = PackedDictionary(self.words_file)
+        usable = None
+        if self.usable_words_file:
+            usable = {}
+            for word in self._read_word_list(self.usable_words_file):
+                usable.setdefault(len(word), []).append(word)
+        for length in reference.lengths():
+            if length < self.min_word_length or length > self.max_word_length:
+                continue
+            ascii_words = reference.words(length)
+            if not len(ascii_words):
+                continue
+            matrix = ascii_words - ord('a')
+            if matrix.max() > 25:
+                raise ValueError(f'{self.words_file} has words with characters '
+                                 f'other than lowercase a to z')
+            if usable is None:
+                usabilities = np.ones(len(matrix), dtype=np.int64)
+            else:
+                # Compare whole words as fixed-length byte strings
+                words = np.ascontiguousarray(ascii_words).view(f'S{length}')
+                usable_words = np.array(usable.get(length, []), dtype=f'S{length}')
+                usabilities = np.isin(words.ravel(), usable_words).astype(np.int64)
+            results = list(_iter_numpy_pairs(matrix, usabilities))
+            if not results:
+                continue
+            # Only make strs for the words in word pairs
+            rows = np.unique(np.concatenate(
+                [np.concatenate([word1s, word2s])
+                 for _, word1s, word2s, _ in results]))
+            letters = sdu.from_codes(matrix[rows])
+            letters = dict(zip(rows.tolist(),
+                               (letters[i:i + length]
+                                for i in range(0, len(letters), length))))
+            for index, word1s, word2s, pair_usabilities in results:
+                shape_pairs = [(letters[w1], letters[w2], usability)
+                               for w1, w2, usability in zip(word1s.tolist(),
+                                                            word2s.tolist(),
+                                                            pair_usabilities.tolist())]
+                yield length, index, shape_pairs
+
+
+    # Engines that can be picked by name when creating a finder
+    ENGINES = {
+        'rotation': _find_word_pairs_rotation,
+        'bucket': _find_word_pairs_bucket,
+        'numpy': _find_word_pairs_numpy,
+    }
+
+
+def _iter_numpy_pairs(matrix, usabilities):
+    """
+    The numpy engine's work for one word length. matrix is an
+    (n x length) uint8 array of letter codes, one row per word, and
+    usabilities has each word's usability. Yields (index, word1 rows,
+    word2 rows, word pair usabilities) arrays for each split index, in
+    order.
+    """
+    length = matrix.shape[1]
+    for index in range(length - 1):
+        others = [c for c in range(length) if c not in (index, index + 1)]
+        # lexsort sorts by the last key first, so this sorts by
+        # the columns outside the split, then by the split
+        keys = [matrix[:, index + 1], matrix[:, index]]
+        keys.extend(matrix[:, c] for c in reversed(others))
+        order = np.lexsort(keys)
+        ordered = matrix[order]
+        # Find the end of the run (bucket) each row is in
+        same_as_next = np.all(ordered[1:, others] == ordered[:-1, others],
+                              axis=1)
+        run_ends = np.flatnonzero(~same_as_next)
+        run_ends = np.append(run_ends, len(ordered) - 1)
+        run_lengths = np.diff(run_ends, prepend=-1)
+        row_run_ends = np.repeat(run_ends, run_lengths)
+        # Every row is a candidate with each row after it in its
+        # run. Rows are sorted by split within a run, so the
+        # first row of a candidate has the lesser split.
+        partner_counts = row_run_ends - np.arange(len(ordered))
+        first = np.repeat(np.arange(len(ordered)), partner_counts)
+        partner_starts = np.cumsum(partner_counts) - partner_counts
+        second = (first + 1 + np.arange(len(first))
+                  - np.repeat(partner_starts, partner_counts))
+        # Words are too similar
+        valid = ((ordered[first, index] != ordered[second, index])
+                 & (ordered[first, index + 1] != ordered[second, index + 1]))
+        word1s = order[first[valid]]
+        word2s = order[second[valid]]
+        yield index, word1s, word2s, usabilities[word1s] + usabilities[word2s]
+
+
+def _find_shard_word_pairs(engine, max_word_length, words):
+    """
+    Find the word pairs for one shard of words in a worker process.
+    Word pairs are sent back as plain tuples, since those are much
+    cheaper to pass between processes than WordPairs.
+    """
+    finder = WordPairFinder(words_file=None,
+                            max_word_length=max_word_length,
+                            engine=engine)
+    return list(finder.ENGINES[engine](finder, words))
@@ -0,0 +1,306 @@
+"""
+Sam Taylor
+October 18 2026
+"""
+
+import gc
+import numpy as np
+import SplitDecisionsUtil as sdu
+from Shape import Shape, PROMPTS_PER_SHAPE
+from WordPair import WordPair
+
+# Letter code for the unused columns of words shorter than the longest
+NO_LETTER = 255
+# Every column a table can have, in the order WordPairTable takes them
+COLUMNS = ('length', 'index', 'splits', 'letters', 'usability',
+           'mistakeables', 'anchors', 'anchor_offsets')
+
+
+class WordPairTable:
+    """
+    WordPairTable holds many word pairs as columns of numpy arrays,
+    instead of as one WordPair (and its dozens of strs and lists) per
+    word pair. Row n of every column is word pair n. Letters are stored
+    as codes, where a is 0 and z is 25.
+    length - length of each word pair
+    index - index of the start of each word pair's split
+    shape - int shape value of each word pair (see Shape.value)
+    splits - (n x 4) letter codes of word1's split, then word2's split
+    letters - (n x width) letter codes of the letters outside the
+              split, padded with NO_LETTER
+    usability - usability of each word pair
+    prompt_id - prompt id of each word pair (see WordPair.prompt_id)
+    mistakeables - (n x width) uint32 mistakeables, or None if
+                   constraints haven't been found
+    anchors - every word pair's anchors, back to back, or None if
+              constraints haven't been found
+    anchor_offsets - word pair n's anchors are
+                     anchors[anchor_offsets[n]:anchor_offsets[n + 1]]
+    WordPairs for individual rows are made on demand, by indexing or
+    iterating over the table, or all at once with word_pairs. Columns
+    can be numpy memmaps (e.g. from ArtifactCache.get_arrays), so a
+    saved table is used without reading it all in.
+    """
+    def __init__(self, length, index, splits, letters, usability,
+                 mistakeables=None, anchors=None, anchor_offsets=None):
+        self.length = np.asarray(length, dtype=np.uint8)
+        self.index = np.asarray(index, dtype=np.uint8)
+        self.splits = np.asarray(splits, dtype=np.uint8).reshape(-1, 4)
+        self.letters = np.asarray(letters, dtype=np.uint8)
+        if self.letters.ndim != 2:
+            # An empty table has no letters to work out its width from
+            width = self.letters.size // max(len(self.length), 1)
+            self.letters = self.letters.reshape(len(self.length), width)
+        self.usability = np.asarray(usability, dtype=np.uint8)
+        self.mistakeables = mistakeables
+        self.anchors = anchors
+        self.anchor_offsets = anchor_offsets
+        length = self.length.astype(np.int64)
+        self.shape = length * (length - 3) // 2 + self.index
+        self.prompt_id = self._get_prompt_ids()
+
+
+    def _get_prompt_ids(self):
+        """
+        Get every word pair's prompt id in one go. Same as
+        WordPair._get_prompt_id.
+        """
+        splits = self.splits.astype(np.int64)
+        character_id = (splits[:, 0]
+                        + splits[:, 1] * 26
+                        + splits[:, 2] * 676
+                        + splits[:, 3] * 17576)
+        return character_id + self.shape * PROMPTS_PER_SHAPE
+
+
+    @classmethod
+    def from_shapes(cls, shapes):
+        """
+        Make a table from (length, index, [(word1, word2, usability)])
+        tuples, like the ones WordPairFinder engines yield, without
+        making a WordPair for each word pair. Rows are sorted the same
+        way as WordPairFinder.find_word_pairs: by shape, then by
+        prompt, then by solution.
+        """
+        shapes = [shape for shape in shapes if shape[2]]
+        width = max((length - 2 for length, _, _ in shapes), default=0)
+        columns = []
+        for length, index, shape_pairs in shapes:
+            count = len(shape_pairs)
+            word1s = sdu.encode_words([word1 for word1, _, _ in shape_pairs],
+                                      length)
+            word2s = sdu.encode_words([word2 for _, word2, _ in shape_pairs],
+                                      length)
+            splits = np.hstack([word1s[:, index:index + 2],
+                                word2s[:, index:index + 2]])
+            letters = np.full((count, width), NO_LETTER, dtype=np.uint8)
+            letters[:, :index] = word1s[:, :index]
+            letters[:, index:length - 2] = word1s[:, index + 2:]
+            usability = [usability for _, _, usability in shape_pairs]
+            columns.append((np.full(count, length), np.full(count, index),
+                            splits, letters, usability))
+        if not columns:
+            return cls([], [], [], [], [])
+        table = cls(*(np.concatenate(column) for column in zip(*columns)))
+        # Sort by shape, then by splits, then by letters. lexsort sorts
+        # by the last key first.
+        keys = [table.letters[:, c] for c in reversed(range(width))]
+        keys.extend(table.splits[:, c] for c in reversed(range(4)))
+        keys.append(table.shape)
+        return table.take(np.lexsort(keys))
+
+
+    @classmethod
+    def from_word_pairs(cls, word_pairs):
+        """
+        Make a table from WordPairs, keeping their order (and their
+        mistakeables and anchors, if they have any)
+        """
+        word_pairs = list(word_pairs)
+        shapes = [(wp.shape.length, wp.shape.index, [(wp.words[0],
+                                                      wp.words[1],
+                                                      wp.usability)])
+                  for wp in word_pairs]
+        table = cls._from_rows(shapes)
+        if any(wp.anchors for wp in word_pairs):
+            table.mistakeables = np.zeros(table.letters.shape, dtype=np.uint32)
+            for n, wp in enumerate(word_pairs):
+                table.mistakeables[n, :len(wp.mistakeables)] = wp.mistakeables
+            table.set_anchors([wp.anchors for wp in word_pairs])
+        return table
+
+
+    @classmethod
+    def _from_rows(cls, shapes):
+        """
+        Same as from_shapes, but keep the rows in the order given
+        """
+        width = max((length - 2 for length, _, _ in shapes), default=0)
+        padding = bytes([NO_LETTER]) * width
+        lengths, indices, splits, letters, usabilities = [], [], [], [], []
+        for length, index, shape_pairs in shapes:
+            for word1, word2, usability in shape_pairs:
+                lengths.append(length)
+                indices.append(index)
+                splits.append(word1[index:index + 2] + word2[index:index + 2])
+                letters.append(word1[:index] + word1[index + 2:])
+                usabilities.append(usability)
+        # Encode every row's letters in one go, padding each row out to
+        # the same width
+        splits = sdu.to_codes(''.join(splits))
+        letters = b''.join((sdu.to_codes(row) + padding)[:width]
+                           for row in letters)
+        return cls(lengths, indices, np.frombuffer(splits, dtype=np.uint8),
+                   np.frombuffer(letters, dtype=np.uint8), usabilities)
+
+
+    def columns(self):
+        """
+        Get every column this table has, as a dict of arrays by name.
+        WordPairTable(**table.columns()) makes the same table again.
+        """
+        columns = {name: getattr(self, name) for name in COLUMNS}
+        return {name: column for name, column in columns.items()
+                if column is not None}
+
+
+    def set_anchors(self, anchors):
+        """
+        Set every word pair's anchors from a list of lists of anchors
+        """
+        counts = [len(row_anchors) for row_anchors in anchors]
+        self.anchor_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.anchor_offsets[1:])
+        self.anchors = np.array([anchor for row_anchors in anchors
+                                 for anchor in row_anchors], dtype=np.uint16)
+
+
+    def shape_counts(self, max_length=12):
+        """
+        Count the word pairs of each shape, like Shape.count_pairs
+        """
+        return np.bincount(self.shape, minlength=Shape.count(max_length))
+
+
+    def letter_bits(self):
+        """
+        Every letter outside the split, encoded like sdu.encode (e.g.
+        a -> 1, b -> 2, c -> 4), as an (n x width) uint32 array. Padding
+        is 0.
+        """
+        return sdu.LETTER_BITS[self.letters]
+
+
+    def take(self, rows):
+        """
+        Make a new table out of the given rows of this one
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        table = WordPairTable(self.length[rows],
+                              self.index[rows],
+                              self.splits[rows],
+                              self.letters[rows],
+                              self.usability[rows])
+        if self.mistakeables is not None:
+            table.mistakeables = self.mistakeables[rows]
+        if self.anchors is not None:
+            counts = np.diff(self.anchor_offsets)[rows]
+            table.anchor_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+            np.cumsum(counts, out=table.anchor_offsets[1:])
+            # Where each of the new table's anchors was in this table
+            gather = (np.repeat(self.anchor_offsets[rows]
+                                - table.anchor_offsets[:-1], counts)
+                      + np.arange(table.anchor_offsets[-1]))
+            table.anchors = self.anchors[gather]
+        return table
+
+
+    def get_anchors(self, row):
+        """
+        Get one word pair's anchors as a list of ints
+        """
+        start, stop = self.anchor_offsets[row], self.anchor_offsets[row + 1]
+        return self.anchors[start:stop].tolist()
+
+
+    def word_pair(self, row):
+        """
+        Make a WordPair for one row of the table
+        """
+        length = int(self.length[row])
+        index = int(self.index[row])
+        letters = sdu.from_codes(self.letters[row, :length - 2])
+        splits = sdu.from_codes(self.splits[row])
+        split1, split2 = splits[:2], splits[2:]
+        wp = WordPair(Shape.get(length, index),
+                      f'{letters[:index]}{split1}{letters[index:]}',
+                      f'{letters[:index]}{split2}{letters[index:]}',
+                      int(self.usability[row]))
+        if self.mistakeables is not None:
+            wp.mistakeables = self.mistakeables[row, :length - 2].tolist()
+        if self.anchors is not None:
+            wp.anchors = self.get_anchors(row)
+        return wp
+
+
+    def word_pairs(self):
+        """
+        Make a WordPair for every row, in order. Much faster than
+        iterating over the table, since every word is decoded in bulk,
+        one shape at a time.
+        """
+        word_pairs = [None] * len(self)
+        usability = self.usability.tolist()
+        order = np.argsort(self.shape, kind='stable')
+        starts = np.flatnonzero(np.diff(self.shape[order], prepend=-1))
+        stops = np.append(starts[1:], len(order))
+        # Making lots of WordPairs in a row sets off the garbage
+        # collector over and over, for nothing, since none of them can
+        # be garbage yet. That's most of the time it takes, so it's
+        # paused until they're all made.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                rows = order[start:stop]
+                length = int(self.length[rows[0]])
+                index = int(self.index[rows[0]])
+                shape = Shape.get(length, index)
+                letters = self.letters[rows, :length - 2]
+                words = []
+                for split in (self.splits[rows, :2], self.splits[rows, 2:]):
+                    codes = np.hstack([letters[:, :index],
+                                       split,
+                                       letters[:, index:]])
+                    text = sdu.from_codes(codes)
+                    words.append([text[i:i + length]
+                                  for i in range(0, len(text), length)])
+                for row, word1, word2 in zip(rows.tolist(), *words):
+                    word_pairs[row] = WordPair(shape, word1, word2,
+                                               usability[row])
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if self.mistakeables is not None:
+            for row, wp in enumerate(word_pairs):
+                wp.mistakeables = self.mistakeables[
+                    row, :len(wp.letters)].tolist()
+        if self.anchors is not None:
+            anchors = self.anchors.tolist()
+            offsets = self.anchor_offsets.tolist()
+            for row, wp in enumerate(word_pairs):
+                wp.anchors = anchors[offsets[row]:offsets[row + 1]]
+        return word_pairs
+
+
+    def __len__(self):
+        return len(self.length)
+
+
+    def __getitem__(self, row):
+        return self.word_pair(row)
+
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.word_pair(row)
@@ -0,0 +1,153 @@
+"""
+Sam Taylor
+October 18 2026
+
+Write word pairs to files, either as text for display or as compact
+binary that can be loaded back in.
+
+Text is written in big chunks: word pairs are formatted a batch at a
+time and each batch goes to the file in one write.
+
+Binary files are a magic number followed by one record per word pair:
+
+    length               B
+    index                B
+    usability            B
+    mistakeables count   B   (0 if the word pair has no constraints)
+    anchors count        B
+    word1                length bytes
+    word2's split        2 bytes
+    mistakeables         mistakeables count x I   (26-bit letter masks)
+    anchors              anchors count x H        (letter index masks)
+"""
+
+import struct
+import SplitDecisionsUtil as sdu
+from PromptIndex import PromptIndex
+from Shape import Shape
+from WordPair import WordPair
+
+BATCH_SIZE = 4096
+BUFFER_SIZE = 1 << 20
+MAGIC = b'SDWP\x01'
+RECORD = struct.Struct('<BBBBB')
+
+
+def format_usability(wp, text):
+    """
+    Format a line with a word pair and its usability. text is the
+    word pair's repr, which the caller usually already has.
+    """
+    return f'{text}  [{wp.usability}]'
+
+
+def format_constraints(wp, text):
+    """
+    Format a line with a word pair, its mistakeables and its anchors.
+    text is the word pair's repr, which the caller usually already has.
+    """
+    return f'{text}  {wp.show_mistakeables()}  {wp.show_anchors()}'
+
+
+def write_word_pairs(word_pairs, output_file, format_line, grouped=False):
+    """
+    Write word pairs to a text file in display order (by shape, then
+    alphabetically), one line per word pair, formatted by format_line.
+    If grouped is True, word_pairs can be a stream that's grouped by
+    shape in order of shape, and only one shape is sorted at a time.
+    Otherwise word_pairs is any iterable, and is sorted all at once.
+    """
+    if grouped:
+        ordered = ((wp, f'{wp}') for wp in sdu.iter_display_order(word_pairs))
+    else:
+        # Keep the display keys around so each repr is only built once
+        keyed = [(sdu.word_pair_display_key(wp), wp) for wp in word_pairs]
+        keyed.sort(key=lambda item: item[0])
+        ordered = ((wp, key[1]) for key, wp in keyed)
+    with open(output_file, 'w', buffering=BUFFER_SIZE) as f:
+        batch = []
+        for wp, text in ordered:
+            batch.append(format_line(wp, text))
+            if len(batch) == BATCH_SIZE:
+                batch.append('')
+                f.write('\n'.join(batch))
+                batch = []
+        if batch:
+            batch.append('')
+            f.write('\n'.join(batch))
+
+
+def write_word_pairs_binary(word_pairs, output_file, by_prompt=False):
+    """
+    Write word pairs to a binary file, in the order they're given. The
+    file can be loaded back with read_word_pairs_binary.
+    If by_prompt is True, word pairs are written grouped by prompt in
+    order of prompt id instead, so the file can be read back one
+    prompt at a time.
+    """
+    if by_prompt:
+        word_pairs = list(word_pairs)
+        word_pairs = [wp for prompt
+                      in PromptIndex.from_word_pairs(word_pairs).group(word_pairs)
+                      for wp in prompt]
+    with open(output_file, 'wb', buffering=BUFFER_SIZE) as f:
+        f.write(MAGIC)
+        batch = []
+        for wp in word_pairs:
+            batch.append(RECORD.pack(wp.shape.length,
+                                     wp.shape.index,
+                                     wp.usability,
+                                     len(wp.mistakeables),
+                                     len(wp.anchors)))
+            batch.append(wp.words[0].encode('ascii'))
+            batch.append(wp.splits[1].encode('ascii'))
+            batch.append(struct.pack(f'<{len(wp.mistakeables)}I',
+                                     *wp.mistakeables))
+            batch.append(struct.pack(f'<{len(wp.anchors)}H', *wp.anchors))
+            if len(batch) >= 5 * BATCH_SIZE:
+                f.write(b''.join(batch))
+                batch = []
+        f.write(b''.join(batch))
+
+
+def iter_word_pairs_binary(input_file):
+    """
+    Load word pairs from a binary file written by
+    write_word_pairs_binary, one at a time, in the order they were
+    written. The file is read a record at a time, so memory doesn't
+    grow with the size of the file.
+    """
+    with open(input_file, 'rb', buffering=BUFFER_SIZE) as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{input_file} is not a binary word pairs file')
+        while True:
+            header = f.read(RECORD.size)
+            if not header:
+                break
+            if len(header) < RECORD.size:
+                raise ValueError(f'{input_file} ends partway through a record')
+            (length, index, usability,
+             mistakeables_count, anchors_count) = RECORD.unpack(header)
+            size = length + 2 + 4 * mistakeables_count + 2 * anchors_count
+            data = f.read(size)
+            if len(data) < size:
+                raise ValueError(f'{input_file} ends partway through a record')
+            word1 = data[:length].decode('ascii')
+            split2 = data[length:length + 2].decode('ascii')
+            word2 = f'{word1[:index]}{split2}{word1[index + 2:]}'
+            wp = WordPair(Shape.get(length, index), word1, word2, usability)
+            offset = length + 2
+            wp.mistakeables = list(struct.unpack_from(f'<{mistakeables_count}I',
+                                                      data, offset))
+            offset += 4 * mistakeables_count
+            wp.anchors = list(struct.unpack_from(f'<{anchors_count}H',
+                                                 data, offset))
+            yield wp
+
+
+def read_word_pairs_binary(input_file):
+    """
+    Load every word pair from a binary file written by
+    write_word_pairs_binary
+    """
+    return list(iter_word_pairs_binary(input_file))